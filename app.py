@@ -7,17 +7,20 @@ Run with: streamlit run app.py
 Default login: admin / admin
 """
 
+import hashlib
 import io
-import time
+import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 import yaml
 
 import database as db
-from zabbix_sla_report import DateRangeCalculator, ExcelReportGenerator, ZabbixAPI
+from zabbix_sla_report import DateRangeCalculator, ExcelReportGenerator, HostRow, ZabbixAPI
 
 # --- Page config (must be first Streamlit call) ---
 st.set_page_config(
@@ -31,15 +34,30 @@ st.set_page_config(
     },
 )
 
-# Initialize database
-db.init_db()
+
+# Initialize database (once per process, not on every rerun)
+@st.cache_resource
+def ensure_db() -> bool:
+    db.init_db()
+    return True
+
+
+ensure_db()
 
 # --- Load config defaults ---
 CONFIG_PATH = Path("config.yaml")
+
+
+@st.cache_resource
+def load_default_config(mtime: float) -> dict:
+    """Parse config.yaml; keyed on its mtime so edits are still picked up."""
+    with open(CONFIG_PATH) as f:
+        return yaml.safe_load(f) or {}
+
+
 default_config = {}
 if CONFIG_PATH.exists():
-    with open(CONFIG_PATH) as f:
-        default_config = yaml.safe_load(f) or {}
+    default_config = load_default_config(CONFIG_PATH.stat().st_mtime)
 
 
 # ============================================================
@@ -139,65 +157,283 @@ def apply_role_css():
 # Helper: SLA cell coloring
 # ============================================================
 
-def color_sla(val, threshold, orange_thresh):
-    if isinstance(val, str):
-        colors = {
-            "COMPLIANT": "background-color: #C6EFCE; color: #006100",
-            "WARNING": "background-color: #FFEB9C; color: #9C5700",
-            "BREACH": "background-color: #FFC7CE; color: #9C0006",
-        }
-        return colors.get(val, "")
-    try:
-        v = float(val)
-    except (ValueError, TypeError):
-        return ""
-    if v >= threshold:
-        return "background-color: #C6EFCE; color: #006100"
-    elif v >= threshold - orange_thresh:
-        return "background-color: #FFEB9C; color: #9C5700"
-    else:
-        return "background-color: #FFC7CE; color: #9C0006"
+# Status labels indexed by classification code (see the Generate Report loop)
+SLA_STATUSES = np.array(["COMPLIANT", "WARNING", "BREACH"])
+
+
+# Cell CSS per classification code, same colors as the Excel report
+SLA_CSS = np.array([
+    "background-color: #C6EFCE; color: #006100",
+    "background-color: #FFEB9C; color: #9C5700",
+    "background-color: #FFC7CE; color: #9C0006",
+])
+
+
+@st.cache_data(show_spinner=False)
+def sla_style_matrix(
+    df: pd.DataFrame, cols: tuple[str, ...], orange_thresh: float, status_col: str | None = None,
+) -> pd.DataFrame:
+    """CSS for Styler.apply(axis=None): colors each of `cols` against
+    "SLA Target (%)", and `status_col` by its label, one column at a time.
+    Cached by the table's contents, so reruns reuse the matrix."""
+    target = df["SLA Target (%)"].to_numpy(dtype=float)
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    for col in cols:
+        values = df[col].to_numpy(dtype=float)
+        codes = np.select([values >= target, values >= target - orange_thresh], [0, 1], default=2)
+        styles[col] = SLA_CSS[codes]
+    if status_col is not None:
+        styles[status_col] = df[status_col].map(dict(zip(SLA_STATUSES, SLA_CSS))).fillna("").to_numpy()
+    return styles
+
+
+def downcast(df: pd.DataFrame, category_cols: tuple[str, ...] = ()) -> pd.DataFrame:
+    """Shrink integer columns (int32/int16) and categorize the given label
+    columns before a table is sent to the browser. Floats stay float64: the
+    grid sorts, copies and exports the sent values, and float32 would turn
+    99.99 into 99.989998."""
+    for c in df.select_dtypes("integer").columns:
+        df[c] = pd.to_numeric(df[c], downcast="integer")
+    for c in category_cols:
+        df[c] = df[c].astype("category")
+    return df
+
+
+def styled_sla_table(
+    df: pd.DataFrame, sla_cols: list[str], orange_thresh: float, status_col: str | None = None,
+):
+    """Shrunk copy of a results table, Styler-colored and formatted like the
+    Excel report."""
+    styles = sla_style_matrix(df, tuple(sla_cols), orange_thresh, status_col)
+    df = downcast(df, (status_col,) if status_col else ())
+    return df.style.apply(lambda _: styles, axis=None).format(
+        {c: "{:.2f}" for c in sla_cols + ["SLA Target (%)"]},
+    )
 
 
 # ============================================================
-# Helper: build Excel bytes
+# Helper: cached Zabbix lookups
 # ============================================================
 
-def build_excel_bytes(all_group_data, all_group_summaries, selected_groups, sla_threshold, orange_threshold, report_mode):
-    """Build Excel report and return (filename, bytes) list."""
-    results = []
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+@st.cache_resource(show_spinner=False)
+def get_api_client(url: str, token: str) -> ZabbixAPI:
+    """Shared Zabbix client per URL/token; the version probe runs only once."""
+    api = ZabbixAPI(url, token)
+    api._call("apiinfo.version", use_auth=False)
+    return api
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_host_groups(url: str, token: str, names: tuple[str, ...] = None) -> list[dict]:
+    """Host groups change rarely, so reruns reuse them for five minutes."""
+    return get_api_client(url, token).get_host_groups(list(names) if names else None)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_hosts_in_group(url: str, token: str, group_id: str) -> list[dict]:
+    """Enabled hosts of a group, cached like cached_host_groups."""
+    return get_api_client(url, token).get_hosts_in_group(group_id)
+
+
+@st.cache_data(persist="disk", max_entries=1000, show_spinner=False)
+def cached_availability(
+    url: str, token: str, host_ids: tuple[str, ...], time_from: int, time_till: int,
+) -> dict[str, dict]:
+    """
+    Bulk host availability, persisted to disk across app restarts.
+    Every report window ends before today, so a closed window's result
+    never changes and needs no TTL (persist="disk" ignores ttl anyway).
+    """
+    return get_api_client(url, token).get_host_availability_bulk(list(host_ids), time_from, time_till)
+
+
+# ============================================================
+# Helper: cached report history
+# ============================================================
+
+HISTORY_PAGE_SIZE = 20
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_reports(limit: int, offset: int = 0) -> list[dict]:
+    return db.get_reports(limit=limit, offset=offset)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_report_count() -> int:
+    return db.get_report_count()
+
 
+@st.cache_data(show_spinner=False, max_entries=500)
+def cached_report_summary(report_id: int) -> list[dict]:
+    """A saved report never changes, so its summary is decoded once."""
+    return db.get_report_summary(report_id)
+
+
+def clear_report_cache():
+    """Drop cached history listings after a report is saved or deleted."""
+    cached_reports.clear()
+    cached_report_count.clear()
+
+
+# ============================================================
+# Helper: build Excel bytes
+# ============================================================
+
+def excel_file_names(all_group_data, report_mode, period, timestamp):
+    """Return (filename, group_name) pairs; group_name is None for the combined file."""
     if report_mode == "combined":
+        return [(f"SLA_Report_{period}_{timestamp}.xlsx", None)]
+    files = []
+    for group_name, host_list in all_group_data.items():
+        if not host_list:
+            continue
+        safe_name = group_name.replace(" ", "_").replace("/", "-")
+        files.append((f"SLA_Report_{safe_name}_{period}_{timestamp}.xlsx", group_name))
+    return files
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_excel_bytes(report_key: str, group_name: str | None, _rpt_data: dict) -> bytes:
+    """Build one Excel workbook (the combined one if group_name is None).
+
+    Cached on report_key, a hash of the report payload taken at generation
+    time, so the workbook is only serialized on the first Download or Save.
+    The payload itself is passed unhashed.
+    """
+    all_group_data = _rpt_data["all_group_data"]
+    all_group_summaries = _rpt_data["all_group_summaries"]
+    selected_groups = _rpt_data["selected_groups"]
+    sla_threshold = _rpt_data["sla_threshold"]
+    orange_threshold = _rpt_data["orange_threshold"]
+
+    if group_name is None:
         report = ExcelReportGenerator(sla_threshold, orange_threshold)
-        for group_name, host_list in all_group_data.items():
-            gc = selected_groups.get(group_name, {})
+        for gname, host_list in all_group_data.items():
+            gc = selected_groups.get(gname, {})
             grp_sla = gc.get("sla_threshold", sla_threshold)
             grp_orange = gc.get("orange_threshold", orange_threshold)
             report.sla_threshold = grp_sla
             report.orange_threshold = grp_orange
-            report.create_sheet(group_name, host_list, grp_sla)
+            report.create_sheet(gname, host_list, grp_sla)
         report.add_summary_sheet(all_group_summaries)
-        buf = io.BytesIO()
-        report.workbook.save(buf)
-        results.append((f"SLA_Report_{period}_{timestamp}.xlsx", buf.getvalue()))
     else:
-        for group_name, host_list in all_group_data.items():
-            if not host_list:
-                continue
-            gc = selected_groups.get(group_name, {})
-            grp_sla = gc.get("sla_threshold", sla_threshold)
-            grp_orange = gc.get("orange_threshold", orange_threshold)
-            report = ExcelReportGenerator(grp_sla, grp_orange)
-            report.create_sheet(group_name, host_list, grp_sla)
-            summary_for_group = [s for s in all_group_summaries if s["group_name"] == group_name]
-            report.add_summary_sheet(summary_for_group)
-            buf = io.BytesIO()
-            report.workbook.save(buf)
-            safe_name = group_name.replace(" ", "_").replace("/", "-")
-            results.append((f"SLA_Report_{safe_name}_{period}_{timestamp}.xlsx", buf.getvalue()))
+        gc = selected_groups.get(group_name, {})
+        grp_sla = gc.get("sla_threshold", sla_threshold)
+        grp_orange = gc.get("orange_threshold", orange_threshold)
+        report = ExcelReportGenerator(grp_sla, grp_orange)
+        report.create_sheet(group_name, all_group_data[group_name], grp_sla)
+        summary_for_group = [s for s in all_group_summaries if s["group_name"] == group_name]
+        report.add_summary_sheet(summary_for_group)
 
-    return results
+    buf = io.BytesIO()
+    report.workbook.save(buf)
+    return buf.getvalue()
+
+
+# ============================================================
+# Helper: render generated report
+# ============================================================
+
+@st.fragment
+def render_report_results(rpt_data: dict):
+    """Show summary/group tables plus download and save buttons.
+
+    Runs as a fragment, so clicking Download or Save only reruns this
+    block instead of the whole page.
+    """
+    all_group_summaries = rpt_data["all_group_summaries"]
+    all_group_data = rpt_data["all_group_data"]
+    r_selected_groups = rpt_data["selected_groups"]
+    r_sla = rpt_data["sla_threshold"]
+    r_orange = rpt_data["orange_threshold"]
+    r_period = rpt_data["period"]
+    report_key = rpt_data["report_key"]
+    excel_files = rpt_data["excel_files"]
+    detail_for_storage = rpt_data["detail_for_storage"]
+    total_host_count = rpt_data["total_host_count"]
+
+    st.success(f"Report generated for {total_host_count} hosts across {len(all_group_summaries)} groups.")
+
+    # Summary table
+    st.subheader("Summary")
+    summary_rows = []
+    for s in all_group_summaries:
+        summary_rows.append({
+            "Group": s["group_name"],
+            "SLA Target (%)": s["sla_threshold"],
+            "Hosts": s["total"],
+            "Compliant": s["compliant"],
+            "Warning": s["warning"],
+            "Breach": s["breach"],
+            "SLA 1 Day (%)": s.get("overall_1_day", 100.0),
+            "SLA 7 Days (%)": s.get("overall_7_days", 100.0),
+            "SLA Prev Month (%)": s.get("overall_prev_month", 100.0),
+            "Overall SLA (%)": s.get("overall_sla", 100.0),
+        })
+
+    summary_df = pd.DataFrame(summary_rows)
+    sla_cols = ["SLA 1 Day (%)", "SLA 7 Days (%)", "SLA Prev Month (%)", "Overall SLA (%)"]
+
+    st.dataframe(styled_sla_table(summary_df, sla_cols, r_orange), use_container_width=True, hide_index=True)
+
+    # Per-group tables
+    for group_name, host_list in all_group_data.items():
+        if not host_list:
+            continue
+        gc = r_selected_groups.get(group_name, {})
+        grp_sla = gc.get("sla_threshold", r_sla)
+        grp_orange = gc.get("orange_threshold", r_orange)
+
+        st.subheader(group_name)
+        display_data = [{
+            "Host Name": h.name,
+            "Host": h.host,
+            "1 Day (%)": h.avail_1_day,
+            "7 Days (%)": h.avail_7_days,
+            "Prev Month (%)": h.avail_prev_month,
+            "Device SLA (%)": h.device_sla,
+            "SLA Target (%)": grp_sla,
+            "Status": h.sla_status,
+        } for h in host_list]
+
+        avail_cols = ["1 Day (%)", "7 Days (%)", "Prev Month (%)", "Device SLA (%)"]
+        st.dataframe(
+            styled_sla_table(pd.DataFrame(display_data), avail_cols, grp_orange, status_col="Status"),
+            use_container_width=True, hide_index=True,
+        )
+
+    # --- Excel download + save to history ---
+    st.divider()
+    st.subheader("Download & Save")
+
+    for filename, file_group in excel_files:
+        def excel_bytes(file_group=file_group):
+            return build_excel_bytes(report_key, file_group, rpt_data)
+
+        col_dl, col_save = st.columns([1, 1])
+        with col_dl:
+            st.download_button(
+                label=f"Download {filename}",
+                data=excel_bytes,
+                file_name=filename,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key=f"dl_{filename}",
+            )
+        with col_save:
+            if st.button(f"Save to history", key=f"save_{filename}"):
+                db.save_report(
+                    generated_by=current_user()["username"],
+                    report_name=filename,
+                    period=r_period,
+                    groups_list=list(all_group_data.keys()),
+                    host_count=total_host_count,
+                    summary_data=all_group_summaries,
+                    detail_data=detail_for_storage,
+                    excel_data=excel_bytes(),
+                )
+                clear_report_cache()
+                st.success("Report saved to history.")
 
 
 # ============================================================
@@ -241,7 +477,7 @@ with st.sidebar:
                 st.error("Please enter Zabbix URL and API token.")
             else:
                 try:
-                    api = ZabbixAPI(zabbix_url, zabbix_token)
+                    api = get_api_client(zabbix_url, zabbix_token)
                     ver = api._call("apiinfo.version", use_auth=False)
                     st.success(f"Connected to Zabbix API v{ver}")
                 except Exception as e:
@@ -258,40 +494,12 @@ if page == "Generate Report":
 
     st.title("Generate SLA Report")
 
-    # --- SLA settings ---
     default_sla = default_config.get("default_sla_threshold", 99.9)
     default_orange = default_config.get("default_orange_threshold", 5.0)
 
-    col_sla1, col_sla2, col_sla3, col_sla4 = st.columns(4)
-    with col_sla1:
-        sla_threshold = st.number_input(
-            "SLA Threshold (%)",
-            value=default_sla, min_value=0.0, max_value=100.0, step=0.01, format="%.2f",
-            disabled=not is_admin(),
-            help="Only admins can change SLA thresholds" if not is_admin() else None,
-        )
-    with col_sla2:
-        orange_threshold = st.number_input(
-            "Warning Threshold (%)",
-            value=default_orange, min_value=0.0, max_value=100.0, step=0.1, format="%.1f",
-            disabled=not is_admin(),
-            help="Only admins can change thresholds" if not is_admin() else None,
-        )
-    with col_sla3:
-        period = st.selectbox(
-            "SLA Period",
-            options=["month", "week", "day"],
-            format_func=lambda x: {"month": "Previous Month", "week": "Last 7 Days", "day": "Last 24 Hours"}[x],
-        )
-    with col_sla4:
-        report_mode = st.selectbox(
-            "Report Mode",
-            options=["combined", "separate"],
-            format_func=lambda x: {"combined": "Combined (one file)", "separate": "Separate (per group)"}[x],
-            index=0 if default_config.get("report_mode", "combined") == "combined" else 1,
-        )
-
     # --- Host group selection ---
+    # Kept outside the form: the source and the chosen groups decide which
+    # fields the form below shows, so they need to rerun immediately.
     st.subheader("Host Groups")
     config_groups = list((default_config.get("host_groups", {}) or {}).keys())
 
@@ -301,15 +509,13 @@ if page == "Generate Report":
         horizontal=True,
     )
 
-    selected_groups = {}
+    chosen_groups = {}  # group name -> per-group config (thresholds, exclusions)
 
     def get_zabbix_api():
         if not zabbix_url or not zabbix_token:
             return None
         try:
-            api = ZabbixAPI(zabbix_url, zabbix_token)
-            api._call("apiinfo.version", use_auth=False)
-            return api
+            return get_api_client(zabbix_url, zabbix_token)
         except Exception:
             return None
 
@@ -318,12 +524,7 @@ if page == "Generate Report":
             chosen = st.multiselect("Host Groups", options=config_groups, default=config_groups)
             host_groups_config = default_config.get("host_groups", {})
             for g in chosen:
-                gc = host_groups_config.get(g, {}) or {}
-                selected_groups[g] = {
-                    "sla_threshold": gc.get("sla_threshold", sla_threshold),
-                    "orange_threshold": gc.get("orange_threshold", orange_threshold),
-                    "excluded_hosts": gc.get("excluded_hosts", []) or [],
-                }
+                chosen_groups[g] = host_groups_config.get(g, {}) or {}
         else:
             st.warning("No host groups found in config.yaml")
 
@@ -331,18 +532,14 @@ if page == "Generate Report":
         api = get_zabbix_api()
         if api:
             try:
-                all_groups = api.get_host_groups()
+                all_groups = cached_host_groups(zabbix_url, zabbix_token)
                 group_names = sorted([g["name"] for g in all_groups])
                 chosen = st.multiselect(
                     "Host Groups", options=group_names,
                     default=[g for g in config_groups if g in group_names],
                 )
                 for g in chosen:
-                    selected_groups[g] = {
-                        "sla_threshold": sla_threshold,
-                        "orange_threshold": orange_threshold,
-                        "excluded_hosts": [],
-                    }
+                    chosen_groups[g] = {}
             except Exception as e:
                 st.error(f"Failed to fetch groups: {e}")
         else:
@@ -353,49 +550,85 @@ if page == "Generate Report":
         for g in manual_groups.strip().split("\n"):
             g = g.strip()
             if g:
-                selected_groups[g] = {
-                    "sla_threshold": sla_threshold,
-                    "orange_threshold": orange_threshold,
-                    "excluded_hosts": [],
-                }
+                chosen_groups[g] = {}
+
+    # --- Report parameters ---
+    # Batched in one form so threshold/exclusion edits don't rerun the page;
+    # everything is applied together when Generate Report is pressed.
+    with st.form("gen_params", border=False):
+        st.subheader("SLA Settings")
+        col_sla1, col_sla2, col_sla3, col_sla4 = st.columns(4)
+        with col_sla1:
+            sla_threshold = st.number_input(
+                "SLA Threshold (%)",
+                value=default_sla, min_value=0.0, max_value=100.0, step=0.01, format="%.2f",
+                disabled=not is_admin(),
+                help="Only admins can change SLA thresholds" if not is_admin() else None,
+            )
+        with col_sla2:
+            orange_threshold = st.number_input(
+                "Warning Threshold (%)",
+                value=default_orange, min_value=0.0, max_value=100.0, step=0.1, format="%.1f",
+                disabled=not is_admin(),
+                help="Only admins can change thresholds" if not is_admin() else None,
+            )
+        with col_sla3:
+            period = st.selectbox(
+                "SLA Period",
+                options=["month", "week", "day"],
+                format_func=lambda x: {"month": "Previous Month", "week": "Last 7 Days", "day": "Last 24 Hours"}[x],
+            )
+        with col_sla4:
+            report_mode = st.selectbox(
+                "Report Mode",
+                options=["combined", "separate"],
+                format_func=lambda x: {"combined": "Combined (one file)", "separate": "Separate (per group)"}[x],
+                index=0 if default_config.get("report_mode", "combined") == "combined" else 1,
+            )
 
-    # Per-group settings (admin only can edit)
-    if selected_groups and is_admin():
-        with st.expander("Per-group threshold overrides", expanded=False):
-            for g in list(selected_groups.keys()):
-                c1, c2, c3 = st.columns([2, 1, 1])
-                with c1:
-                    st.markdown(f"**{g}**")
-                with c2:
-                    selected_groups[g]["sla_threshold"] = st.number_input(
-                        f"SLA % ({g})", value=selected_groups[g]["sla_threshold"],
-                        min_value=0.0, max_value=100.0, step=0.01, format="%.2f",
-                        key=f"sla_{g}", label_visibility="collapsed",
-                    )
-                with c3:
-                    selected_groups[g]["orange_threshold"] = st.number_input(
-                        f"Warn % ({g})", value=selected_groups[g]["orange_threshold"],
-                        min_value=0.0, max_value=100.0, step=0.1, format="%.1f",
-                        key=f"orange_{g}", label_visibility="collapsed",
-                    )
+        selected_groups = {
+            g: {
+                "sla_threshold": gc.get("sla_threshold", sla_threshold),
+                "orange_threshold": gc.get("orange_threshold", orange_threshold),
+                "excluded_hosts": gc.get("excluded_hosts", []) or [],
+            }
+            for g, gc in chosen_groups.items()
+        }
 
-    # Excluded hosts
-    global_excluded_str = st.text_area(
-        "Global Excluded Hosts (one per line)",
-        value="\n".join(default_config.get("global_excluded_hosts", []) or []),
-        height=68,
-        disabled=not is_admin(),
-    )
-    global_excluded = [h.strip() for h in global_excluded_str.strip().split("\n") if h.strip()]
+        # Per-group settings (admin only can edit)
+        if selected_groups and is_admin():
+            with st.expander("Per-group threshold overrides", expanded=False):
+                for g in list(selected_groups.keys()):
+                    c1, c2, c3 = st.columns([2, 1, 1])
+                    with c1:
+                        st.markdown(f"**{g}**")
+                    with c2:
+                        selected_groups[g]["sla_threshold"] = st.number_input(
+                            f"SLA % ({g})", value=selected_groups[g]["sla_threshold"],
+                            min_value=0.0, max_value=100.0, step=0.01, format="%.2f",
+                            key=f"sla_{g}", label_visibility="collapsed",
+                        )
+                    with c3:
+                        selected_groups[g]["orange_threshold"] = st.number_input(
+                            f"Warn % ({g})", value=selected_groups[g]["orange_threshold"],
+                            min_value=0.0, max_value=100.0, step=0.1, format="%.1f",
+                            key=f"orange_{g}", label_visibility="collapsed",
+                        )
 
-    # --- Generate button (right-aligned) ---
-    st.divider()
-    _, btn_col = st.columns([3, 1])
-    with btn_col:
-        generate_clicked = st.button("Generate Report", type="primary", use_container_width=True)
-    if generate_clicked:
-        st.session_state["trigger_generate"] = True
-    generate_btn = st.session_state.pop("trigger_generate", False)
+        # Excluded hosts
+        global_excluded_str = st.text_area(
+            "Global Excluded Hosts (one per line)",
+            value="\n".join(default_config.get("global_excluded_hosts", []) or []),
+            height=68,
+            disabled=not is_admin(),
+        )
+        global_excluded = [h.strip() for h in global_excluded_str.strip().split("\n") if h.strip()]
+
+        # --- Generate button (right-aligned) ---
+        st.divider()
+        _, btn_col = st.columns([3, 1])
+        with btn_col:
+            generate_btn = st.form_submit_button("Generate Report", type="primary", use_container_width=True)
 
     if generate_btn and selected_groups:
         if not zabbix_url or not zabbix_token:
@@ -403,18 +636,22 @@ if page == "Generate Report":
             st.stop()
 
         try:
-            api = ZabbixAPI(zabbix_url, zabbix_token)
-            api._call("apiinfo.version", use_auth=False)
+            api = get_api_client(zabbix_url, zabbix_token)
         except Exception as e:
             st.error(f"Cannot connect to Zabbix: {e}")
             st.stop()
 
         date_calc = DateRangeCalculator()
         availability_periods = date_calc.get_availability_periods()
-        global_excluded_lower = [h.lower() for h in global_excluded]
+        # Epoch bounds of each availability window, converted once
+        period_bounds = {
+            key: (int(start.timestamp()), int(end.timestamp()))
+            for key, (start, end) in availability_periods.items()
+        }
+        global_excluded_lower = frozenset(h.lower() for h in global_excluded)
 
         group_names_list = list(selected_groups.keys())
-        groups = api.get_host_groups(group_names_list)
+        groups = cached_host_groups(zabbix_url, zabbix_token, tuple(group_names_list))
 
         if not groups:
             st.error(f"No matching host groups found in Zabbix: {group_names_list}")
@@ -428,12 +665,12 @@ if page == "Generate Report":
         progress = st.progress(0, text="Starting...")
         all_group_summaries = []
         all_group_data = {}
-        total_hosts_processed = 0
+        periods_fetched = 0
 
         total_hosts = 0
         group_hosts_map = {}
         for group in groups:
-            hosts = api.get_hosts_in_group(group["groupid"])
+            hosts = cached_hosts_in_group(zabbix_url, zabbix_token, group["groupid"])
             group_hosts_map[group["groupid"]] = hosts
             total_hosts += len(hosts)
 
@@ -442,98 +679,104 @@ if page == "Generate Report":
             st.warning("No enabled hosts found in the selected groups.")
             st.stop()
 
+        # Apply exclusions up front so only included hosts are fetched
+        group_included_map = {}
+        for group in groups:
+            gc = selected_groups.get(group["name"], {})
+            grp_excluded = gc.get("excluded_hosts", []) or []
+            all_excluded_lower = global_excluded_lower.union(h.lower() for h in grp_excluded)
+            group_included_map[group["groupid"]] = [
+                h for h in group_hosts_map[group["groupid"]]
+                if h["name"].lower() not in all_excluded_lower
+                and h["host"].lower() not in all_excluded_lower
+            ]
+
+        # One bulk availability query per period covers every included host
+        # in every group; the three periods are fetched concurrently.
+        fetch_host_ids = tuple(sorted({
+            host["hostid"]
+            for included in group_included_map.values()
+            for host in included
+        }))
+        period_labels = {"1_day": "1 Day", "7_days": "7 Days", "prev_month": "Previous Month"}
+        # Row of the per-host arrays that holds the report period's device SLA
+        period_index = {"day": 0, "week": 1, "month": 2}[period]
+
+        avail_map = {}
+        if fetch_host_ids:
+            with ThreadPoolExecutor(max_workers=len(period_labels)) as executor:
+                futures = {
+                    executor.submit(
+                        cached_availability,
+                        zabbix_url,
+                        zabbix_token,
+                        fetch_host_ids,
+                        *period_bounds[period_key],
+                    ): period_key
+                    for period_key in period_labels
+                }
+                for future in as_completed(futures):
+                    period_key = futures[future]
+                    avail_map[period_key] = future.result()
+                    periods_fetched += 1
+                    pct = periods_fetched / len(futures)
+                    progress.progress(pct, text=f"Fetched availability: {period_labels[period_key]}")
+
         for group in groups:
             group_name = group["name"]
             group_id = group["groupid"]
             gc = selected_groups.get(group_name, {})
             grp_sla = gc.get("sla_threshold", sla_threshold)
             grp_orange = gc.get("orange_threshold", orange_threshold)
-            grp_excluded = gc.get("excluded_hosts", []) or []
-            grp_excluded_lower = [h.lower() for h in grp_excluded]
-            all_excluded_lower = global_excluded_lower + grp_excluded_lower
 
-            hosts = group_hosts_map[group_id]
-            host_data_list = []
+            hosts = group_included_map[group_id]
+            n_hosts = len(hosts)
             summary = {
                 "group_name": group_name,
                 "sla_threshold": grp_sla,
                 "total": 0, "compliant": 0, "warning": 0, "breach": 0,
             }
 
-            for host in hosts:
-                host_id = host["hostid"]
-                host_name = host["name"]
-                host_technical = host["host"]
-
-                total_hosts_processed += 1
-                pct = total_hosts_processed / total_hosts
-                progress.progress(pct, text=f"Processing: {host_name} ({group_name})")
-
-                if host_name.lower() in all_excluded_lower or host_technical.lower() in all_excluded_lower:
-                    continue
-
-                avail_1_day = api.get_host_availability(
-                    host_id,
-                    int(availability_periods["1_day"][0].timestamp()),
-                    int(availability_periods["1_day"][1].timestamp()),
-                )
-                avail_7_days = api.get_host_availability(
-                    host_id,
-                    int(availability_periods["7_days"][0].timestamp()),
-                    int(availability_periods["7_days"][1].timestamp()),
-                )
-                avail_prev_month = api.get_host_availability(
-                    host_id,
-                    int(availability_periods["prev_month"][0].timestamp()),
-                    int(availability_periods["prev_month"][1].timestamp()),
-                )
-
-                if period == "day":
-                    device_sla = avail_1_day["availability"]
-                elif period == "week":
-                    device_sla = avail_7_days["availability"]
-                else:
-                    device_sla = avail_prev_month["availability"]
-
-                if device_sla >= grp_sla:
-                    status = "COMPLIANT"
-                    summary["compliant"] += 1
-                elif device_sla >= grp_sla - grp_orange:
-                    status = "WARNING"
-                    summary["warning"] += 1
-                else:
-                    status = "BREACH"
-                    summary["breach"] += 1
-                summary["total"] += 1
-
-                host_data_list.append({
-                    "name": host_name,
-                    "host": host_technical,
-                    "avail_1_day": avail_1_day["availability"],
-                    "avail_7_days": avail_7_days["availability"],
-                    "avail_prev_month": avail_prev_month["availability"],
-                    "device_sla": device_sla,
-                    "sla_status": status,
-                    "downtime_1_day": avail_1_day["downtime_seconds"],
-                    "downtime_7_days": avail_7_days["downtime_seconds"],
-                    "downtime_prev_month": avail_prev_month["downtime_seconds"],
-                    "total_1_day": avail_1_day["total_seconds"],
-                    "total_7_days": avail_7_days["total_seconds"],
-                    "total_prev_month": avail_prev_month["total_seconds"],
-                })
+            # Per-host columns (SoA): one row per period, in period_labels order
+            avail = np.empty((3, n_hosts))
+            downtime = np.empty((3, n_hosts), dtype=np.int64)
+            total = np.empty((3, n_hosts), dtype=np.int64)
+            for i, host in enumerate(hosts):
+                for p, period_key in enumerate(period_labels):
+                    host_avail = avail_map[period_key][host["hostid"]]
+                    avail[p, i] = host_avail["availability"]
+                    downtime[p, i] = host_avail["downtime_seconds"]
+                    total[p, i] = host_avail["total_seconds"]
+
+            # Classify all hosts of the group at once: 0=compliant, 1=warning, 2=breach
+            device_slas = avail[period_index]
+            status_codes = np.select(
+                [device_slas >= grp_sla, device_slas >= grp_sla - grp_orange], [0, 1], default=2,
+            )
+            counts = np.bincount(status_codes, minlength=3)
+            summary.update({
+                "total": n_hosts,
+                "compliant": int(counts[0]), "warning": int(counts[1]), "breach": int(counts[2]),
+            })
 
-            if host_data_list:
-                td1 = sum(h["downtime_1_day"] for h in host_data_list)
-                td7 = sum(h["downtime_7_days"] for h in host_data_list)
-                tdm = sum(h["downtime_prev_month"] for h in host_data_list)
-                tp1 = sum(h["total_1_day"] for h in host_data_list)
-                tp7 = sum(h["total_7_days"] for h in host_data_list)
-                tpm = sum(h["total_prev_month"] for h in host_data_list)
-
-                o1 = ((tp1 - td1) / tp1 * 100) if tp1 > 0 else 100.0
-                o7 = ((tp7 - td7) / tp7 * 100) if tp7 > 0 else 100.0
-                om = ((tpm - tdm) / tpm * 100) if tpm > 0 else 100.0
-                overall_sla = {"day": o1, "week": o7, "month": om}[period]
+            # One HostRow (a plain tuple, no per-host dict) per host
+            host_data_list = list(map(
+                HostRow,
+                [host["name"] for host in hosts], [host["host"] for host in hosts],
+                *avail.tolist(), device_slas.tolist(),
+                *downtime.tolist(), *total.tolist(), SLA_STATUSES[status_codes].tolist(),
+            ))
+
+            if n_hosts:
+                # Sum downtime and possible time for all periods in one pass
+                td = downtime.sum(axis=1)
+                tp = total.sum(axis=1)
+
+                # Overall SLA per period; 100% where there was no possible time
+                ratio = np.ones(3)
+                np.divide(tp - td, tp, out=ratio, where=tp > 0)
+                o1, o7, om = (ratio * 100).tolist()
+                overall_sla = (o1, o7, om)[period_index]
                 summary.update({
                     "overall_1_day": round(o1, 2),
                     "overall_7_days": round(o7, 2),
@@ -549,28 +792,29 @@ if page == "Generate Report":
             all_group_summaries.append(summary)
             all_group_data[group_name] = host_data_list
 
-        progress.progress(1.0, text="Done!")
-        time.sleep(0.3)
         progress.empty()
 
-        # Store results in session state so they survive reruns (e.g. save button click)
-        excel_files = build_excel_bytes(
+        # Excel files are only named here; the workbooks are built on first download/save
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        excel_files = excel_file_names(all_group_data, report_mode, period, timestamp)
+        report_key = hashlib.blake2b(pickle.dumps((
             all_group_data, all_group_summaries, selected_groups,
-            sla_threshold, orange_threshold, report_mode,
-        )
+            sla_threshold, orange_threshold, period, excel_files,
+        )), digest_size=16).hexdigest()
 
         # Build detail for storage
         detail_for_storage = {}
         for gn, hlist in all_group_data.items():
             detail_for_storage[gn] = [{
-                "name": h["name"], "host": h["host"],
-                "avail_1_day": h["avail_1_day"],
-                "avail_7_days": h["avail_7_days"],
-                "avail_prev_month": h["avail_prev_month"],
-                "device_sla": h["device_sla"],
-                "sla_status": h["sla_status"],
+                "name": h.name, "host": h.host,
+                "avail_1_day": h.avail_1_day,
+                "avail_7_days": h.avail_7_days,
+                "avail_prev_month": h.avail_prev_month,
+                "device_sla": h.device_sla,
+                "sla_status": h.sla_status,
             } for h in hlist]
 
+        # Store results in session state so they survive reruns (e.g. save button click)
         st.session_state["last_report"] = {
             "all_group_summaries": all_group_summaries,
             "all_group_data": all_group_data,
@@ -578,6 +822,7 @@ if page == "Generate Report":
             "sla_threshold": sla_threshold,
             "orange_threshold": orange_threshold,
             "period": period,
+            "report_key": report_key,
             "excel_files": excel_files,
             "detail_for_storage": detail_for_storage,
             "total_host_count": sum(s["total"] for s in all_group_summaries),
@@ -586,118 +831,7 @@ if page == "Generate Report":
     # --- Display results from session state ---
     rpt_data = st.session_state.get("last_report")
     if rpt_data:
-        all_group_summaries = rpt_data["all_group_summaries"]
-        all_group_data = rpt_data["all_group_data"]
-        r_selected_groups = rpt_data["selected_groups"]
-        r_sla = rpt_data["sla_threshold"]
-        r_orange = rpt_data["orange_threshold"]
-        r_period = rpt_data["period"]
-        excel_files = rpt_data["excel_files"]
-        detail_for_storage = rpt_data["detail_for_storage"]
-        total_host_count = rpt_data["total_host_count"]
-
-        st.success(f"Report generated for {total_host_count} hosts across {len(all_group_summaries)} groups.")
-
-        # Summary table
-        st.subheader("Summary")
-        summary_rows = []
-        for s in all_group_summaries:
-            summary_rows.append({
-                "Group": s["group_name"],
-                "SLA Target (%)": s["sla_threshold"],
-                "Hosts": s["total"],
-                "Compliant": s["compliant"],
-                "Warning": s["warning"],
-                "Breach": s["breach"],
-                "SLA 1 Day (%)": s.get("overall_1_day", 100.0),
-                "SLA 7 Days (%)": s.get("overall_7_days", 100.0),
-                "SLA Prev Month (%)": s.get("overall_prev_month", 100.0),
-                "Overall SLA (%)": s.get("overall_sla", 100.0),
-            })
-
-        summary_df = pd.DataFrame(summary_rows)
-        sla_cols = ["SLA 1 Day (%)", "SLA 7 Days (%)", "SLA Prev Month (%)", "Overall SLA (%)"]
-
-        def style_summary(row):
-            styles = [""] * len(row)
-            target = row["SLA Target (%)"]
-            for col in sla_cols:
-                idx = summary_df.columns.get_loc(col)
-                styles[idx] = color_sla(row[col], target, r_orange)
-            return styles
-
-        styled_summary = summary_df.style.apply(style_summary, axis=1).format(
-            {c: "{:.2f}" for c in sla_cols + ["SLA Target (%)"]},
-        )
-        st.dataframe(styled_summary, use_container_width=True, hide_index=True)
-
-        # Per-group tables
-        for group_name, host_list in all_group_data.items():
-            if not host_list:
-                continue
-            gc = r_selected_groups.get(group_name, {})
-            grp_sla = gc.get("sla_threshold", r_sla)
-            grp_orange = gc.get("orange_threshold", r_orange)
-
-            st.subheader(group_name)
-            display_data = [{
-                "Host Name": h["name"],
-                "Host": h["host"],
-                "1 Day (%)": h["avail_1_day"],
-                "7 Days (%)": h["avail_7_days"],
-                "Prev Month (%)": h["avail_prev_month"],
-                "Device SLA (%)": h["device_sla"],
-                "SLA Target (%)": grp_sla,
-                "Status": h["sla_status"],
-            } for h in host_list]
-
-            df = pd.DataFrame(display_data)
-            avail_cols = ["1 Day (%)", "7 Days (%)", "Prev Month (%)", "Device SLA (%)"]
-
-            _grp_sla = grp_sla
-            _grp_orange = grp_orange
-
-            def style_group_row(row, _sla=_grp_sla, _orange=_grp_orange):
-                styles = [""] * len(row)
-                for col in avail_cols:
-                    idx = df.columns.get_loc(col)
-                    styles[idx] = color_sla(row[col], _sla, _orange)
-                status_idx = df.columns.get_loc("Status")
-                styles[status_idx] = color_sla(row["Status"], _sla, _orange)
-                return styles
-
-            styled_df = df.style.apply(style_group_row, axis=1).format(
-                {c: "{:.2f}" for c in avail_cols + ["SLA Target (%)"]},
-            )
-            st.dataframe(styled_df, use_container_width=True, hide_index=True)
-
-        # --- Excel download + save to history ---
-        st.divider()
-        st.subheader("Download & Save")
-
-        for filename, excel_bytes in excel_files:
-            col_dl, col_save = st.columns([1, 1])
-            with col_dl:
-                st.download_button(
-                    label=f"Download {filename}",
-                    data=excel_bytes,
-                    file_name=filename,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key=f"dl_{filename}",
-                )
-            with col_save:
-                if st.button(f"Save to history", key=f"save_{filename}"):
-                    db.save_report(
-                        generated_by=user["username"],
-                        report_name=filename,
-                        period=r_period,
-                        groups_list=list(all_group_data.keys()),
-                        host_count=total_host_count,
-                        summary_data=all_group_summaries,
-                        detail_data=detail_for_storage,
-                        excel_data=excel_bytes,
-                    )
-                    st.success("Report saved to history.")
+        render_report_results(rpt_data)
 
 
 # ============================================================
@@ -708,85 +842,108 @@ elif page == "Report History":
 
     st.title("Report History")
 
-    report_count = db.get_report_count()
+    report_count = cached_report_count()
     if report_count == 0:
         st.info("No reports saved yet. Generate a report and click 'Save to history'.")
     else:
-        st.caption(f"{report_count} report(s) in history")
-
-        reports = db.get_reports(limit=100)
-
-        for rpt in reports:
-            with st.expander(
-                f"{rpt['report_name']}  |  {rpt['generated_at']}  |  by {rpt['generated_by']}  |  {rpt['host_count']} hosts",
-                expanded=False,
-            ):
-                col_info, col_actions = st.columns([3, 1])
-
-                with col_info:
-                    st.markdown(f"**Period:** {rpt['period']}  \n"
-                                f"**Groups:** {', '.join(rpt['groups_list'])}  \n"
-                                f"**Generated:** {rpt['generated_at']}  \n"
-                                f"**By:** {rpt['generated_by']}")
-
-                    # Show summary table if available
-                    if rpt["summary_data"]:
-                        summary_rows = []
-                        for s in rpt["summary_data"]:
-                            summary_rows.append({
-                                "Group": s.get("group_name", ""),
-                                "SLA Target (%)": s.get("sla_threshold", 99.9),
-                                "Hosts": s.get("total", 0),
-                                "Compliant": s.get("compliant", 0),
-                                "Warning": s.get("warning", 0),
-                                "Breach": s.get("breach", 0),
-                                "Overall SLA (%)": s.get("overall_sla", 100.0),
-                            })
-                        if summary_rows:
-                            sdf = pd.DataFrame(summary_rows)
-
-                            def style_hist_row(row):
-                                styles = [""] * len(row)
-                                target = row["SLA Target (%)"]
-                                idx = sdf.columns.get_loc("Overall SLA (%)")
-                                styles[idx] = color_sla(row["Overall SLA (%)"], target, 5.0)
-                                return styles
-
-                            styled = sdf.style.apply(style_hist_row, axis=1).format(
-                                {"SLA Target (%)": "{:.2f}", "Overall SLA (%)": "{:.2f}"},
-                            )
-                            st.dataframe(styled, use_container_width=True, hide_index=True)
-
-                with col_actions:
-                    # Download Excel
-                    excel_data = db.get_report_excel(rpt["id"])
-                    if excel_data:
-                        st.download_button(
-                            label="Download Excel",
-                            data=excel_data,
-                            file_name=rpt["report_name"],
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            key=f"hist_dl_{rpt['id']}",
-                        )
+        page_count = -(-report_count // HISTORY_PAGE_SIZE)
+        # Clamp in case reports were deleted since the page was chosen
+        page_num = min(st.session_state.setdefault("hist_page", 0), page_count - 1)
+        st.session_state["hist_page"] = page_num
+        st.caption(f"{report_count} report(s) in history  |  page {page_num + 1} of {page_count}")
+
+        reports = cached_reports(limit=HISTORY_PAGE_SIZE, offset=page_num * HISTORY_PAGE_SIZE)
+
+        # One table for the whole page; details render only for the selected row.
+        # The key changes with the page and after a delete so the selection resets.
+        reports_df = pd.DataFrame([{
+            "Report": rpt["report_name"],
+            "Generated": rpt["generated_at"],
+            "By": rpt["generated_by"],
+            "Period": rpt["period"],
+            "Hosts": rpt["host_count"],
+        } for rpt in reports])
+        event = st.dataframe(
+            reports_df, use_container_width=True, hide_index=True,
+            on_select="rerun", selection_mode="single-row",
+            key=f"hist_table_{page_num}_{st.session_state.get('hist_deletes', 0)}",
+        )
+
+        if page_count > 1:
+            col_prev, col_next, _ = st.columns([1, 1, 6])
+            with col_prev:
+                if st.button("Previous", key="hist_prev", disabled=page_num == 0):
+                    st.session_state["hist_page"] = page_num - 1
+                    st.rerun()
+            with col_next:
+                if st.button("Next", key="hist_next", disabled=page_num >= page_count - 1):
+                    st.session_state["hist_page"] = page_num + 1
+                    st.rerun()
+
+        selected_rows = [i for i in event.selection.rows if i < len(reports)]
+        if not selected_rows:
+            st.caption("Select a report to see its summary, download or delete it.")
+        else:
+            rpt = reports[selected_rows[0]]
+            st.divider()
+            st.subheader(rpt["report_name"])
+            col_info, col_actions = st.columns([3, 1])
+
+            with col_info:
+                st.markdown(f"**Period:** {rpt['period']}  \n"
+                            f"**Groups:** {', '.join(rpt['groups_list'])}  \n"
+                            f"**Generated:** {rpt['generated_at']}  \n"
+                            f"**By:** {rpt['generated_by']}")
+
+                # Show summary table if available
+                summary_data = cached_report_summary(rpt["id"])
+                if summary_data:
+                    summary_rows = []
+                    for s in summary_data:
+                        summary_rows.append({
+                            "Group": s.get("group_name", ""),
+                            "SLA Target (%)": s.get("sla_threshold", 99.9),
+                            "Hosts": s.get("total", 0),
+                            "Compliant": s.get("compliant", 0),
+                            "Warning": s.get("warning", 0),
+                            "Breach": s.get("breach", 0),
+                            "Overall SLA (%)": s.get("overall_sla", 100.0),
+                        })
+                    if summary_rows:
+                        styled = styled_sla_table(pd.DataFrame(summary_rows), ["Overall SLA (%)"], 5.0)
+                        st.dataframe(styled, use_container_width=True, hide_index=True)
+
+            with col_actions:
+                # Download Excel (read from the database only when clicked)
+                if rpt["has_excel"]:
+                    st.download_button(
+                        label="Download Excel",
+                        data=lambda report_id=rpt["id"]: db.get_report_excel(report_id),
+                        file_name=rpt["report_name"],
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"hist_dl_{rpt['id']}",
+                    )
 
-                    # View detail
-                    view_details = st.button("View Details", key=f"hist_view_{rpt['id']}")
+                # View detail
+                view_details = st.button("View Details", key=f"hist_view_{rpt['id']}")
 
-                    # Delete (admin only)
-                    if is_admin():
-                        if st.button("Delete", key=f"hist_del_{rpt['id']}", type="secondary"):
-                            db.delete_report(rpt["id"])
-                            st.rerun()
+                # Delete (admin only)
+                if is_admin():
+                    if st.button("Delete", key=f"hist_del_{rpt['id']}", type="secondary"):
+                        db.delete_report(rpt["id"])
+                        clear_report_cache()
+                        st.session_state["hist_deletes"] = st.session_state.get("hist_deletes", 0) + 1
+                        st.rerun()
 
-                # Render detail tables at full width (outside columns)
-                if view_details:
-                    full_report = db.get_report(rpt["id"])
-                    if full_report and full_report.get("detail_data"):
-                        for gn, hlist in full_report["detail_data"].items():
-                            st.markdown(f"**{gn}**")
-                            if hlist:
-                                hdf = pd.DataFrame(hlist)
-                                st.dataframe(hdf, use_container_width=True, hide_index=True)
+            # Render detail tables at full width (outside columns)
+            if view_details:
+                # Each group's hosts are loaded separately, so the first table shows early
+                for gn in db.get_report_groups(rpt["id"]):
+                    st.markdown(f"**{gn}**")
+                    # Stored as Arrow, so no dtype inference or pandas round trip here
+                    hosts_table = db.get_report_group_table(rpt["id"], gn)
+                    if hosts_table.num_rows:
+                        st.dataframe(hosts_table, use_container_width=True, hide_index=True)
 
 
 # ============================================================
@@ -904,8 +1061,7 @@ elif page == "User Management":
         if edit_submitted:
             # Prevent removing the last admin
             if selected_user_data["role"] == "admin" and edit_role == "user":
-                admin_count = sum(1 for u in users_list if u["role"] == "admin")
-                if admin_count <= 1:
+                if db.count_admins() <= 1:
                     st.error("Cannot remove the last admin user.")
                     st.stop()
 
@@ -922,8 +1078,7 @@ elif page == "User Management":
             if selected_user_id == user["id"]:
                 st.error("You cannot delete your own account.")
             else:
-                admin_count = sum(1 for u in users_list if u["role"] == "admin")
-                if selected_user_data["role"] == "admin" and admin_count <= 1:
+                if selected_user_data["role"] == "admin" and db.count_admins() <= 1:
                     st.error("Cannot delete the last admin user.")
                 else:
                     db.delete_user(selected_user_id)
@@ -4,36 +4,92 @@ Handles user authentication, roles, and report history using SQLite.
 """
 
 import hashlib
-import json
+import hmac
 import secrets
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import zstandard
+
 DB_PATH = Path(__file__).parent / "sla_app.db"
 
+# Frame header of zstd data; rows saved before compression hold plain .xlsx bytes / JSON text
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+_local = threading.local()
+
+
+def _connection() -> sqlite3.Connection:
+    """This thread's connection, opened and configured on first use."""
+    path = str(DB_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path:
+        if conn is not None:
+            conn.close()
+        # Autocommit mode; get_db() issues BEGIN/COMMIT itself. No type
+        # detection: timestamps are shown as stored, so skip the converters.
+        conn = sqlite3.connect(path, isolation_level=None, detect_types=0, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        # Only takes effect when the database file is first created
+        conn.execute("PRAGMA page_size=8192")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")
+        # Serve reads (blobs especially) from a memory map instead of copying pages
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn, _local.path = conn, path
+    return conn
+
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    """Context manager running one transaction on the thread's cached connection."""
+    conn = _connection()
+    if conn.in_transaction:
+        # Nested use joins the outer transaction
+        yield conn
+        return
+    conn.execute("BEGIN")
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
+        # executescript() commits on its own, so the transaction may be over
+        if conn.in_transaction:
+            conn.execute("COMMIT")
+    except BaseException:
+        # Also on KeyboardInterrupt/SystemExit and Streamlit's rerun/stop
+        # exceptions: an open transaction left on the cached connection would
+        # swallow every later get_db() and hold the write lock
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         raise
-    finally:
-        conn.close()
+
+
+# Database files whose schema init_db() has already brought up to date in this process
+_initialized: set[str] = set()
 
 
 def init_db():
-    """Create tables and default admin user if they don't exist."""
+    """Create tables and default admin user if they don't exist.
+
+    Runs once per database file per process; later calls return immediately.
+    """
+    path = str(DB_PATH)
+    if path in _initialized:
+        return
     with get_db() as conn:
+        had_history_index = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_report_history_generated_at'"
+        ).fetchone() is not None
+
         conn.executescript("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,11 +109,65 @@ def init_db():
                 groups_list TEXT NOT NULL,
                 host_count INTEGER DEFAULT 0,
                 generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                summary_data TEXT,
-                detail_data TEXT,
+                summary_data BLOB  -- zstd-compressed JSON (TEXT in older rows)
+            );
+
+            -- Per-group host details, loaded one group at a time. hosts_arrow is a
+            -- zstd-compressed Arrow IPC stream.
+            CREATE TABLE IF NOT EXISTS report_detail (
+                report_id INTEGER NOT NULL REFERENCES report_history(id) ON DELETE CASCADE,
+                group_name TEXT NOT NULL,
+                hosts_arrow BLOB,
+                PRIMARY KEY (report_id, group_name)
+            );
+
+            -- Kept out of report_history so metadata scans don't page through blobs
+            CREATE TABLE IF NOT EXISTS report_excel (
+                report_id INTEGER PRIMARY KEY REFERENCES report_history(id) ON DELETE CASCADE,
                 excel_data BLOB
             );
+
+            -- History is always listed newest first
+            CREATE INDEX IF NOT EXISTS idx_report_history_generated_at
+                ON report_history(generated_at DESC);
+
+            -- Lets count_admins() count from the index alone
+            CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
         """)
+        # executescript() committed; run the rest (migrations included) as one transaction
+        conn.execute("BEGIN")
+        if not had_history_index:
+            # Let the planner see the new index's statistics
+            conn.execute("ANALYZE")
+
+        # Move blobs of databases created before report_excel existed
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(report_history)")}
+        if "excel_data" in columns:
+            conn.execute(
+                "INSERT OR IGNORE INTO report_excel (report_id, excel_data) "
+                "SELECT id, excel_data FROM report_history WHERE excel_data IS NOT NULL"
+            )
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                conn.execute("ALTER TABLE report_history DROP COLUMN excel_data")
+            else:
+                # Only rows not yet cleared, so later starts don't rewrite the table
+                conn.execute("UPDATE report_history SET excel_data = NULL WHERE excel_data IS NOT NULL")
+
+        # Split detail_data of databases created before report_detail existed
+        if "detail_data" in columns:
+            rows = conn.execute(
+                "SELECT id, detail_data FROM report_history WHERE detail_data IS NOT NULL"
+            ).fetchall()
+            for row in rows:
+                detail = load_json_blob(row["detail_data"])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO report_detail (report_id, group_name, hosts_arrow) VALUES (?, ?, ?)",
+                    [(row["id"], gn, dump_arrow_blob(hosts)) for gn, hosts in detail.items()],
+                )
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                conn.execute("ALTER TABLE report_history DROP COLUMN detail_data")
+            else:
+                conn.execute("UPDATE report_history SET detail_data = NULL WHERE detail_data IS NOT NULL")
 
         # Create default admin if no users exist
         row = conn.execute("SELECT COUNT(*) as cnt FROM users").fetchone()
@@ -68,20 +178,43 @@ def init_db():
                 "VALUES (?, ?, ?, ?, ?)",
                 ("admin", pw_hash, salt, "admin", "Administrator"),
             )
+    _initialized.add(path)
 
 
 # --- Password utilities ---
 
+# scrypt cost parameters (N = 2**SCRYPT_LOG_N); stored in each hash so they can be raised later
+SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P = 14, 8, 1
+
+
+def _scrypt(password: str, salt: str, log_n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(), n=2 ** log_n, r=r, p=p,
+        maxmem=256 * r * 2 ** log_n, dklen=32,
+    )
+
+
 def hash_password(password: str, salt: str = None) -> tuple[str, str]:
+    """Hash with scrypt. The hash is tagged "scrypt$<log N>$<r>$<p>$<hex key>"."""
     if salt is None:
         salt = secrets.token_hex(16)
-    pw_hash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 260000)
-    return pw_hash.hex(), salt
+    key = _scrypt(password, salt, SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_LOG_N}${SCRYPT_R}${SCRYPT_P}${key.hex()}", salt
 
 
 def verify_password(password: str, pw_hash: str, salt: str) -> bool:
+    if pw_hash.startswith("scrypt$"):
+        _, log_n, r, p, key_hex = pw_hash.split("$")
+        test_hash = _scrypt(password, salt, int(log_n), int(r), int(p))
+        return hmac.compare_digest(test_hash, bytes.fromhex(key_hex))
+    # Untagged hashes are PBKDF2-SHA256 from before the switch to scrypt
     test_hash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 260000)
-    return test_hash.hex() == pw_hash
+    return hmac.compare_digest(test_hash, bytes.fromhex(pw_hash))
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    """True if the hash is not scrypt with the current parameters."""
+    return not pw_hash.startswith(f"scrypt${SCRYPT_LOG_N}${SCRYPT_R}${SCRYPT_P}$")
 
 
 # --- User operations ---
@@ -90,9 +223,17 @@ def authenticate(username: str, password: str) -> dict | None:
     """Authenticate user. Returns user dict or None."""
     with get_db() as conn:
         row = conn.execute(
-            "SELECT * FROM users WHERE username = ?", (username,)
+            "SELECT id, username, password_hash, salt, role, display_name FROM users WHERE username = ?",
+            (username,),
         ).fetchone()
         if row and verify_password(password, row["password_hash"], row["salt"]):
+            if needs_rehash(row["password_hash"]):
+                # Upgrade legacy hashes while the plain password is at hand
+                pw_hash, salt = hash_password(password)
+                conn.execute(
+                    "UPDATE users SET password_hash = ?, salt = ? WHERE id = ?",
+                    (pw_hash, salt, row["id"]),
+                )
             return dict(row)
     return None
 
@@ -105,6 +246,11 @@ def get_all_users() -> list[dict]:
         return [dict(r) for r in rows]
 
 
+def count_admins() -> int:
+    with get_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'").fetchone()[0]
+
+
 def get_user(user_id: int) -> dict | None:
     with get_db() as conn:
         row = conn.execute(
@@ -162,7 +308,7 @@ def delete_user(user_id: int) -> bool:
 def change_password(user_id: int, old_password: str, new_password: str) -> bool:
     """Change password after verifying the old one. Returns True on success."""
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+        row = conn.execute("SELECT password_hash, salt FROM users WHERE id = ?", (user_id,)).fetchone()
         if not row:
             return False
         if not verify_password(old_password, row["password_hash"], row["salt"]):
@@ -175,8 +321,77 @@ def change_password(user_id: int, old_password: str, new_password: str) -> bool:
         return True
 
 
+# --- Blob compression ---
+
+def compress_blob(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def decompress_blob(data: bytes | str | None) -> bytes | str | None:
+    """Return the original contents of a stored column, compressed or not."""
+    if isinstance(data, bytes) and data[:4] == ZSTD_MAGIC:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def dump_json_blob(obj) -> bytes:
+    """JSON-encode (numpy scalars/arrays included) and compress for storage."""
+    return compress_blob(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY))
+
+
+def load_json_blob(data: bytes | str):
+    return orjson.loads(decompress_blob(data))
+
+
+def dump_arrow_blob(rows: list[dict]) -> bytes:
+    """Encode rows as a zstd-compressed Arrow IPC stream, column types fixed at save time.
+
+    Arrow stores the rows column-wise, so keys are written once per group.
+    Low-cardinality string columns (e.g. sla_status) are dictionary-encoded.
+    """
+    table = pa.Table.from_pylist(rows)
+    for i, column in enumerate(table.columns):
+        if pa.types.is_string(column.type) and pc.count_distinct(column).as_py() * 2 <= len(column):
+            table = table.set_column(i, table.field(i).name, pc.dictionary_encode(column))
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def load_arrow_blob(data: bytes) -> pa.Table:
+    return pa.ipc.open_stream(data).read_all()
+
+
 # --- Report history operations ---
 
+# Hot-path statements as constants: with one long-lived connection per thread
+# (see get_db), each is parsed once and then served from the statement cache.
+_REPORT_META_COLUMNS = (
+    "id, generated_by, report_name, period, groups_list, host_count, generated_at, "
+    # Whether a workbook is stored, without reading it (NULL-ness is in the row header)
+    "EXISTS (SELECT 1 FROM report_excel e WHERE e.report_id = report_history.id "
+    "AND e.excel_data IS NOT NULL) AS has_excel"
+)
+_SQL_LIST_REPORTS = (
+    f"SELECT {_REPORT_META_COLUMNS} FROM report_history ORDER BY generated_at DESC LIMIT ? OFFSET ?"
+)
+_SQL_REPORT_META = f"SELECT {_REPORT_META_COLUMNS} FROM report_history WHERE id = ?"
+_SQL_REPORT_COUNT = "SELECT COUNT(*) as cnt FROM report_history"
+_SQL_REPORT_SUMMARY = "SELECT summary_data FROM report_history WHERE id = ?"
+_SQL_REPORT_GROUPS = "SELECT group_name FROM report_detail WHERE report_id = ? ORDER BY rowid"
+_SQL_REPORT_GROUP = "SELECT hosts_arrow FROM report_detail WHERE report_id = ? AND group_name = ?"
+_SQL_REPORT_EXCEL = "SELECT excel_data FROM report_excel WHERE report_id = ?"
+_SQL_INSERT_REPORT = (
+    "INSERT INTO report_history "
+    "(generated_by, report_name, period, groups_list, host_count, summary_data) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_SQL_INSERT_DETAIL = "INSERT INTO report_detail (report_id, group_name, hosts_arrow) VALUES (?, ?, ?)"
+_SQL_INSERT_EXCEL = "INSERT INTO report_excel (report_id, excel_data) VALUES (?, ?)"
+
+
 def save_report(
     generated_by: str,
     report_name: str,
@@ -187,65 +402,122 @@ def save_report(
     detail_data: dict,
     excel_data: bytes,
 ) -> int:
-    """Save a generated report to history. Returns report id."""
+    """Save a generated report to history. Returns report id.
+
+    The Excel blob, the summary and each group's host details (one
+    report_detail row per group) are stored zstd-compressed; the getters
+    decompress them.
+    """
     with get_db() as conn:
         cur = conn.execute(
-            "INSERT INTO report_history "
-            "(generated_by, report_name, period, groups_list, host_count, summary_data, detail_data, excel_data) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            _SQL_INSERT_REPORT,
             (
                 generated_by,
                 report_name,
                 period,
-                json.dumps(groups_list),
+                orjson.dumps(groups_list).decode(),
                 host_count,
-                json.dumps(summary_data),
-                json.dumps(detail_data),
-                excel_data,
+                dump_json_blob(summary_data),
             ),
         )
+        conn.executemany(
+            _SQL_INSERT_DETAIL,
+            [(cur.lastrowid, gn, dump_arrow_blob(hosts)) for gn, hosts in detail_data.items()],
+        )
+        conn.execute(_SQL_INSERT_EXCEL, (cur.lastrowid, compress_blob(excel_data)))
         return cur.lastrowid
 
 
 def get_reports(limit: int = 50, offset: int = 0) -> list[dict]:
-    """Get report history (metadata only, no blobs)."""
+    """Get report history (metadata only, no summaries or blobs).
+
+    has_excel tells whether a workbook is stored for the report.
+    """
     with get_db() as conn:
-        rows = conn.execute(
-            "SELECT id, generated_by, report_name, period, groups_list, host_count, generated_at, summary_data "
-            "FROM report_history ORDER BY generated_at DESC LIMIT ? OFFSET ?",
-            (limit, offset),
-        ).fetchall()
+        rows = conn.execute(_SQL_LIST_REPORTS, (limit, offset)).fetchall()
         results = []
         for r in rows:
             d = dict(r)
-            d["groups_list"] = json.loads(d["groups_list"])
-            d["summary_data"] = json.loads(d["summary_data"]) if d["summary_data"] else []
+            d["groups_list"] = orjson.loads(d["groups_list"])
+            d["has_excel"] = bool(d["has_excel"])
             results.append(d)
         return results
 
 
-def get_report(report_id: int) -> dict | None:
-    """Get a single report with all data including Excel blob."""
+def get_report_summary(report_id: int) -> list[dict]:
+    """Get just the per-group summary of a report."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM report_history WHERE id = ?", (report_id,)
-        ).fetchone()
+        row = conn.execute(_SQL_REPORT_SUMMARY, (report_id,)).fetchone()
+        return load_json_blob(row["summary_data"]) if row and row["summary_data"] else []
+
+
+def get_report_meta(report_id: int) -> dict | None:
+    """Get a single report's metadata (the columns listed by get_reports)."""
+    with get_db() as conn:
+        row = conn.execute(_SQL_REPORT_META, (report_id,)).fetchone()
         if not row:
             return None
         d = dict(row)
-        d["groups_list"] = json.loads(d["groups_list"])
-        d["summary_data"] = json.loads(d["summary_data"]) if d["summary_data"] else []
-        d["detail_data"] = json.loads(d["detail_data"]) if d["detail_data"] else {}
+        d["groups_list"] = orjson.loads(d["groups_list"])
+        d["has_excel"] = bool(d["has_excel"])
         return d
 
 
+def get_report(report_id: int) -> dict | None:
+    """Get a single report with all data including Excel blob."""
+    with get_db():
+        d = get_report_meta(report_id)
+        if d is None:
+            return None
+        d["summary_data"] = get_report_summary(report_id)
+        d["detail_data"] = {gn: get_report_group(report_id, gn) for gn in get_report_groups(report_id)}
+        d["excel_data"] = get_report_excel(report_id)
+        return d
+
+
+def get_report_groups(report_id: int) -> list[str]:
+    """Names of the groups that have stored host details, in report order."""
+    with get_db() as conn:
+        rows = conn.execute(_SQL_REPORT_GROUPS, (report_id,)).fetchall()
+        return [r["group_name"] for r in rows]
+
+
+def get_report_group_table(report_id: int, group_name: str) -> pa.Table:
+    """Host details of one group of a report as an Arrow table."""
+    with get_db() as conn:
+        row = conn.execute(_SQL_REPORT_GROUP, (report_id, group_name)).fetchone()
+        if not row:
+            return pa.table({})
+        return load_arrow_blob(row["hosts_arrow"])
+
+
+def get_report_group(report_id: int, group_name: str) -> list[dict]:
+    """Host details of one group of a report."""
+    return get_report_group_table(report_id, group_name).to_pylist()
+
+
 def get_report_excel(report_id: int) -> bytes | None:
-    """Get just the Excel data for a report."""
+    """Get just the Excel data for a report.
+
+    The stored blob is read with incremental blob I/O and fed straight into
+    the zstd decompressor, so the compressed copy is never held in memory.
+    """
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT excel_data FROM report_history WHERE id = ?", (report_id,)
-        ).fetchone()
-        return row["excel_data"] if row else None
+        if not hasattr(conn, "blobopen"):  # Python < 3.11
+            row = conn.execute(_SQL_REPORT_EXCEL, (report_id,)).fetchone()
+            return decompress_blob(row["excel_data"]) if row else None
+        try:
+            # report_id is the rowid of report_excel
+            blob = conn.blobopen("report_excel", "excel_data", report_id, readonly=True)
+        except sqlite3.OperationalError:
+            return None  # no such report, or no workbook stored
+        with blob:
+            if blob.read(4) != ZSTD_MAGIC:
+                blob.seek(0)
+                return blob.read()
+            blob.seek(0)
+            with zstandard.ZstdDecompressor().stream_reader(blob, closefd=False) as reader:
+                return reader.read()
 
 
 def delete_report(report_id: int) -> bool:
@@ -256,5 +528,5 @@ def delete_report(report_id: int) -> bool:
 
 def get_report_count() -> int:
     with get_db() as conn:
-        row = conn.execute("SELECT COUNT(*) as cnt FROM report_history").fetchone()
+        row = conn.execute(_SQL_REPORT_COUNT).fetchone()
         return row["cnt"]
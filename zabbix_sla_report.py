@@ -7,17 +7,39 @@ Supports custom date ranges, previous week, and previous month reporting.
 """
 
 import argparse
-import json
+import collections
+import itertools
+import multiprocessing
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+import orjson
 import requests
 import yaml
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; downtime is then summed with NumPy
+    njit = None
+
+# Only problems whose name contains this (case-insensitive) count as downtime;
+# event.get filters on it server-side
+ICMP_PROBLEM = "Unavailable by ICMP"
+
+
+class ZabbixAPIError(Exception):
+    """A Zabbix API call failed (after retries) or returned an error."""
 
 
 class ZabbixAPI:
@@ -26,33 +48,59 @@ class ZabbixAPI:
     def __init__(self, url: str, token: str):
         self.url = url.rstrip("/") + "/api_jsonrpc.php"
         self.token = token
-        self.request_id = 0
+        # itertools.count is safe to share between worker threads
+        self._request_ids = itertools.count(1)
+        # Reuse TCP/TLS connections across calls (HTTP keep-alive); the pool is
+        # sized for concurrent callers sharing one client
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # All methods used here are read-only *.get calls, so retrying the POST
+        # on gateway errors or dropped connections is safe
+        retry = Retry(
+            total=3,
+            connect=3,
+            read=3,
+            status=3,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "ZabbixAPI":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _call(self, method: str, params: dict = None, use_auth: bool = True) -> Any:
         """Make an API call to Zabbix."""
-        self.request_id += 1
         payload = {
             "jsonrpc": "2.0",
             "method": method,
             "params": params or {},
-            "id": self.request_id,
+            "id": next(self._request_ids),
         }
 
-        headers = {"Content-Type": "application/json"}
-        if use_auth:
-            headers["Authorization"] = f"Bearer {self.token}"
+        headers = {"Authorization": f"Bearer {self.token}"} if use_auth else None
 
         try:
-            response = requests.post(self.url, json=payload, headers=headers, timeout=60)
+            response = self.session.post(self.url, data=orjson.dumps(payload), headers=headers, timeout=60)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
 
             if "error" in result:
-                raise Exception(f"Zabbix API error: {result['error']}")
+                raise ZabbixAPIError(f"Zabbix API error: {result['error']}")
 
             return result.get("result")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request failed: {e}")
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            raise ZabbixAPIError(f"Request failed: {e}") from e
 
     def get_host_groups(self, names: list[str] = None) -> list[dict]:
         """Get host groups, optionally filtered by name."""
@@ -118,15 +166,113 @@ class ZabbixAPI:
         retain resolved problems depending on housekeeper/recent settings.
         Two-step: fetch PROBLEM events, then batch-fetch recovery events.
         """
+        return self.get_host_availability_bulk([host_id], time_from, time_till)[host_id]
+
+    def get_host_availability_bulk(
+        self, host_ids: list[str], time_from: int, time_till: int
+    ) -> dict[str, dict]:
+        """
+        Calculate availability for many hosts over one time range.
+        Returns a dict of hostid -> availability dict (see get_host_availability).
+
+        Each event.get covers all hosts at once and the events are bucketed
+        by hostid afterwards, so the number of API calls stays constant
+        regardless of how many hosts are passed in.
+        """
+        events_by_host, recovery_map = self.get_host_events_bulk(host_ids, time_from, time_till)
+        return {
+            host_id: availability_stats(
+                compute_downtime(host_events, recovery_map, time_from, time_till),
+                time_from,
+                time_till,
+            )
+            for host_id, host_events in events_by_host.items()
+        }
+
+    def get_host_events(
+        self, host_id: str, time_from: int, time_till: int
+    ) -> tuple[list[dict], dict[str, int]]:
+        """
+        Fetch the PROBLEM events of one host that may overlap a time range.
+        Returns (events, recovery_map); see get_host_events_bulk.
+        """
+        events_by_host, recovery_map = self.get_host_events_bulk([host_id], time_from, time_till)
+        return events_by_host[host_id], recovery_map
+
+    def _get_events_before(
+        self, host_ids: list[str], time_till: int, per_host_limit: int = 50
+    ) -> list[dict]:
+        """
+        The per_host_limit most recent ICMP PROBLEM events of each host at or
+        before time_till.
+
+        The limit of a bulk event.get is shared by all hosts, so a host with
+        many recent events could push out the older, still open problem of
+        another. When a page is cut off by the limit, the query is repeated
+        further back in time for the hosts that haven't got their share yet.
+        """
+        params = {
+            "output": ["eventid", "clock", "r_eventid"],
+            "source": 0,
+            "object": 0,
+            "value": "1",
+            "search": {"name": ICMP_PROBLEM},
+            "selectHosts": ["hostid"],
+            "sortfield": ["clock"],
+            "sortorder": "DESC",
+        }
+        events = []
+        taken = dict.fromkeys(host_ids, 0)
+        pending = list(host_ids)
+        while pending:
+            limit = per_host_limit * len(pending)
+            page = self._call("event.get", {**params, "hostids": pending, "time_till": time_till, "limit": limit})
+            truncated = len(page) >= limit
+            # A cut-off page may be missing some events of its oldest second;
+            # those are left to the next page (unless the whole page is that
+            # second, which can't be paged past)
+            oldest = int(page[-1]["clock"]) if truncated else None
+            skip_oldest = truncated and int(page[0]["clock"]) != oldest
+            for event in page:
+                if skip_oldest and int(event["clock"]) == oldest:
+                    break
+                wanted = False
+                for host in event.get("hosts", []):
+                    if taken.get(host["hostid"], per_host_limit) < per_host_limit:
+                        taken[host["hostid"]] += 1
+                        wanted = True
+                if wanted:
+                    events.append(event)
+            if not truncated:
+                break
+            pending = [host_id for host_id in pending if taken[host_id] < per_host_limit]
+            time_till = oldest if skip_oldest else oldest - 1
+        return events
+
+    def get_host_events_bulk(
+        self, host_ids: list[str], time_from: int, time_till: int
+    ) -> tuple[dict[str, list[dict]], dict[str, int]]:
+        """
+        Fetch PROBLEM events that may overlap a time range, for many hosts.
+        Returns (hostid -> events, r_eventid -> recovery clock).
+
+        The events can be passed to compute_downtime for the whole range or
+        any sub-range of it, so one fetch over the span of several report
+        periods serves all of them.
+        """
         # Step 1: Get PROBLEM events (value=1) within the time window
         params = {
-            "output": ["eventid", "clock", "r_eventid", "name"],
-            "hostids": [host_id],
+            "output": ["eventid", "clock", "r_eventid"],
+            "hostids": host_ids,
             "time_from": time_from,
             "time_till": time_till,
             "source": 0,   # Triggers
             "object": 0,   # Trigger events
             "value": "1",  # PROBLEM events only
+            # Only "Unavailable by ICMP ping" problems; Zabbix matches the
+            # name case-insensitively, so it needn't be sent back
+            "search": {"name": ICMP_PROBLEM},
+            "selectHosts": ["hostid"],
             "sortfield": ["clock"],
             "sortorder": "ASC",
         }
@@ -134,77 +280,154 @@ class ZabbixAPI:
 
         # Step 2: Get PROBLEM events that started BEFORE the window
         # (they may still have been active during the window)
-        params_before = {
-            "output": ["eventid", "clock", "r_eventid", "name"],
-            "hostids": [host_id],
-            "time_till": time_from - 1,
-            "source": 0,
-            "object": 0,
-            "value": "1",
-            "sortfield": ["clock"],
-            "sortorder": "DESC",
-            "limit": 50,
-        }
-        events_before = self._call("event.get", params_before)
+        events_before = self._get_events_before(host_ids, time_from - 1)
 
         # Combine all candidate events
         all_events = list(events_in_window) + list(events_before)
 
         # Step 3: Collect all recovery event IDs so we can batch-fetch their timestamps
-        recovery_ids = []
+        # (a set: events of several hosts may share a recovery event)
+        recovery_ids: set[str] = set()
         for evt in all_events:
             r_id = evt.get("r_eventid", "0")
             if r_id and r_id != "0":
-                recovery_ids.append(r_id)
+                recovery_ids.add(r_id)
 
         # Step 4: Batch-fetch recovery events to get their clock (= recovery time)
         recovery_map = {}  # r_eventid -> clock
         if recovery_ids:
             recovery_params = {
                 "output": ["eventid", "clock"],
-                "eventids": recovery_ids,
+                "eventids": list(recovery_ids),
             }
             recovery_events = self._call("event.get", recovery_params)
             for rev in recovery_events:
                 recovery_map[rev["eventid"]] = int(rev["clock"])
 
-        # Step 5: Calculate downtime
-        total_seconds = time_till - time_from
-        downtime_seconds = 0
-
+        # Step 5: Bucket events by host
+        events_by_host = {host_id: [] for host_id in host_ids}
         for event in all_events:
-            # Only count "Unavailable by ICMP ping" problems
-            event_name = event.get("name", "").lower()
-            if "unavailable by icmp" not in event_name:
-                continue
-
-            event_start = int(event["clock"])
-            r_eventid = event.get("r_eventid", "0")
-
-            if r_eventid and r_eventid != "0":
-                # Resolved: look up recovery time
-                event_end = recovery_map.get(r_eventid, time_till)
+            for host in event.get("hosts", []):
+                if host["hostid"] in events_by_host:
+                    events_by_host[host["hostid"]].append(event)
+
+        return events_by_host, recovery_map
+
+
+# End of problems still open (or whose recovery is unknown); clamps to any range end
+OPEN_END = np.iinfo(np.int64).max
+
+
+def event_intervals(
+    events: list[dict], recovery_map: dict[str, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end clocks of problem events (get_host_events_bulk returns
+    only 'Unavailable by ICMP ping' problems). Unresolved problems end at
+    OPEN_END, so the arrays do not depend on the range they are later
+    clamped to.
+    """
+    starts = np.fromiter((int(e["clock"]) for e in events), dtype=np.int64, count=len(events))
+    # Resolved: look up recovery time. Unresolved events carry r_eventid "0" (or
+    # none), which is never a key of recovery_map, so they fall through to open.
+    recovery_clock = recovery_map.get
+    ends = np.fromiter(
+        (recovery_clock(e.get("r_eventid"), OPEN_END) for e in events),
+        dtype=np.int64,
+        count=len(events),
+    )
+    return starts, ends
+
+
+def clamped_downtime(starts: np.ndarray, ends: np.ndarray, time_from: int, time_till: int) -> int:
+    """Seconds of the [start, end] intervals that fall within [time_from, time_till]."""
+    if njit is not None:
+        return int(_clamped_downtime_jit(starts, ends, time_from, time_till))
+    # Clamp to the time range; intervals outside it come out negative
+    overlap = np.minimum(ends, time_till) - np.maximum(starts, time_from)
+    return int(np.maximum(overlap, 0).sum())
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _clamped_downtime_jit(starts, ends, time_from, time_till):
+        # Single native pass, no temporary arrays; compiled once and cached on disk
+        total = 0
+        for i in range(starts.size):
+            start = max(starts[i], time_from)
+            end = min(ends[i], time_till)
+            if end > start:
+                total += end - start
+        return total
+
+
+def summarize_group(
+    device_slas: np.ndarray,
+    downtime: np.ndarray,
+    total: np.ndarray,
+    sla_threshold: float,
+    orange_threshold: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compliant/warning/breach host counts for device_slas, plus downtime and
+    possible seconds summed per period (the rows of the (periods, hosts)
+    downtime and total arrays).
+    """
+    if njit is not None:
+        return _summarize_group_jit(device_slas, downtime, total, sla_threshold, orange_threshold)
+    # 0=compliant, 1=warning, 2=breach
+    status_codes = np.select(
+        [device_slas >= sla_threshold, device_slas >= sla_threshold - orange_threshold], [0, 1], default=2,
+    )
+    return np.bincount(status_codes, minlength=3), downtime.sum(axis=1), total.sum(axis=1)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _summarize_group_jit(device_slas, downtime, total, sla_threshold, orange_threshold):
+        # Classification and both reductions fused into one native pass
+        counts = np.zeros(3, dtype=np.int64)
+        downtime_sums = np.zeros(downtime.shape[0], dtype=np.int64)
+        total_sums = np.zeros(total.shape[0], dtype=np.int64)
+        warning_floor = sla_threshold - orange_threshold
+        for i in range(device_slas.size):
+            if device_slas[i] >= sla_threshold:
+                counts[0] += 1
+            elif device_slas[i] >= warning_floor:
+                counts[1] += 1
             else:
-                # Still active / unresolved
-                event_end = time_till
-
-            # Clamp to the time range
-            actual_start = max(event_start, time_from)
-            actual_end = min(event_end, time_till)
-
-            if actual_end > actual_start:
-                downtime_seconds += actual_end - actual_start
-
-        if total_seconds > 0:
-            availability = ((total_seconds - downtime_seconds) / total_seconds) * 100
-        else:
-            availability = 100.0
+                counts[2] += 1
+            for p in range(downtime.shape[0]):
+                downtime_sums[p] += downtime[p, i]
+                total_sums[p] += total[p, i]
+        return counts, downtime_sums, total_sums
+
+
+def compute_downtime(
+    events: list[dict], recovery_map: dict[str, int], time_from: int, time_till: int
+) -> int:
+    """
+    Seconds within [time_from, time_till] covered by the given problem
+    events (as returned by get_host_events_bulk). Events outside the range
+    contribute nothing, so the same event list can be reused for several
+    ranges.
+    """
+    return clamped_downtime(*event_intervals(events, recovery_map), time_from, time_till)
+
+
+def availability_stats(downtime_seconds: int, time_from: int, time_till: int) -> dict:
+    """Availability dict (availability %, downtime and total seconds) for a range."""
+    total_seconds = time_till - time_from
+    if total_seconds > 0:
+        availability = ((total_seconds - downtime_seconds) / total_seconds) * 100
+    else:
+        availability = 100.0
 
-        return {
-            "availability": round(availability, 2),
-            "downtime_seconds": downtime_seconds,
-            "total_seconds": total_seconds,
-        }
+    return {
+        "availability": round(availability, 2),
+        "downtime_seconds": downtime_seconds,
+        "total_seconds": total_seconds,
+    }
 
 
 class DateRangeCalculator:
@@ -273,15 +496,28 @@ class DateRangeCalculator:
         }
 
 
+# One host of a group's device sheet: availability (%), downtime and possible
+# seconds per period, plus the device SLA and its status
+HostRow = collections.namedtuple(
+    "HostRow",
+    "name host avail_1_day avail_7_days avail_prev_month device_sla"
+    " downtime_1_day downtime_7_days downtime_prev_month"
+    " total_1_day total_7_days total_prev_month sla_status",
+)
+
+
 class ExcelReportGenerator:
-    """Generate Excel reports with conditional formatting."""
+    """Generate Excel reports with conditional formatting.
+
+    Uses openpyxl's write-only mode: rows are streamed out as they are
+    appended instead of being kept as cell objects, so sheets must be
+    written top-to-bottom and column sizes set before the first row.
+    """
 
     def __init__(self, sla_threshold: float, orange_threshold: float):
         self.sla_threshold = sla_threshold
         self.orange_threshold = orange_threshold
-        self.workbook = Workbook()
-        # Remove default sheet
-        self.workbook.remove(self.workbook.active)
+        self.workbook = Workbook(write_only=True)
 
         # Define styles
         self.header_fill = PatternFill(
@@ -307,18 +543,86 @@ class ExcelReportGenerator:
             bottom=Side(style="thin"),
         )
         self.center_align = Alignment(horizontal="center", vertical="center")
+        self.header_align = Alignment(
+            horizontal="center", vertical="center", wrap_text=True
+        )
 
-    def get_cell_style(self, value: float) -> tuple:
-        """Determine cell fill and font based on value and thresholds."""
-        if value >= self.sla_threshold:
-            return self.green_fill, self.green_font
-        elif value >= self.sla_threshold - self.orange_threshold:
-            return self.orange_fill, self.orange_font
+        # Every cell gets one of a few named styles, registered once per
+        # workbook; assigning a style by name is a single lookup instead of
+        # setting fill, font, border and alignment on each cell
+        status_colors = {
+            "COMPLIANT": (self.green_fill, self.green_font),
+            "WARNING": (self.orange_fill, self.orange_font),
+            "BREACH": (self.red_fill, self.red_font),
+        }
+        self._add_style("header", fill=self.header_fill, font=self.header_font, alignment=self.header_align)
+        self._add_style("text")
+        self._add_style("label", font=Font(bold=True, size=11))
+        self._add_style("center", alignment=self.center_align)
+        self._add_style("number", alignment=self.center_align, number_format="0.00")
+        self._add_style("number bold", font=Font(bold=True), alignment=self.center_align, number_format="0.00")
+        for status, (fill, font) in status_colors.items():
+            bold = Font(bold=True, color=font.color)
+            self._add_style(status, fill=fill, font=font, alignment=self.center_align)
+            self._add_style(f"{status} bold", fill=fill, font=bold, alignment=self.center_align)
+            self._add_style(f"{status} number", fill=fill, font=font, alignment=self.center_align, number_format="0.00")
+            self._add_style(
+                f"{status} number bold", fill=fill, font=bold, alignment=self.center_align, number_format="0.00",
+            )
+
+    def _add_style(self, name: str, fill=None, font=None, alignment=None, number_format="General"):
+        """Register a bordered named style on the workbook."""
+        # Unstyled text keeps the workbook's default font, as plain cells do
+        style = NamedStyle(
+            name=f"SLA {name}", font=font or DEFAULT_FONT, border=self.border, number_format=number_format,
+        )
+        if fill is not None:
+            style.fill = fill
+        if alignment is not None:
+            style.alignment = alignment
+        self.workbook.add_named_style(style)
+
+    def get_status(self, value: float, sla_target: float = None) -> str:
+        """SLA status of a value: COMPLIANT, WARNING or BREACH (also its style name)."""
+        if sla_target is None:
+            sla_target = self.sla_threshold
+        if value >= sla_target:
+            return "COMPLIANT"
+        elif value >= sla_target - self.orange_threshold:
+            return "WARNING"
         else:
-            return self.red_fill, self.red_font
+            return "BREACH"
+
+    def _cell(self, ws, value, style: str = "text"):
+        """Create a write-only cell with one of the named styles."""
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = f"SLA {style}"
+        return cell
 
-    def create_sheet(self, sheet_name: str, data: list[dict], sla_target: float):
+    def create_sheet(self, sheet_name: str, data: list[HostRow], sla_target: float):
         """Create a worksheet with host availability data."""
+        # HostRow fields in order: name, host, 4 availability, 3 downtime,
+        # 3 possible seconds, status
+        columns = [list(column) for column in zip(*data)] if data else [[] for _ in HostRow._fields]
+        self.create_sheet_columns(
+            sheet_name, columns[0], columns[1], columns[2:6], columns[6:9], columns[9:12], sla_target,
+        )
+
+    def create_sheet_columns(
+        self,
+        sheet_name: str,
+        names: list[str],
+        hosts: list[str],
+        availability: list[list[float]],
+        downtime: list[list[int]],
+        possible: list[list[int]],
+        sla_target: float,
+    ):
+        """
+        Create a worksheet from per-host columns: availability holds the
+        1 day, 7 days, prev month and device SLA columns; downtime and
+        possible hold the seconds of the three periods.
+        """
         # Truncate sheet name to Excel's 31 character limit
         safe_name = sheet_name[:31] if len(sheet_name) > 31 else sheet_name
         ws = self.workbook.create_sheet(title=safe_name)
@@ -335,149 +639,91 @@ class ExcelReportGenerator:
             "SLA Status",
         ]
 
-        # Write headers
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = self.header_fill
-            cell.font = self.header_font
-            cell.border = self.border
-            cell.alignment = Alignment(
-                horizontal="center", vertical="center", wrap_text=True
+        # Thresholds are fixed for the sheet: compare each host value against
+        # the precomputed warning floor instead of calling get_status per cell
+        sla_threshold = self.sla_threshold
+        warn_threshold = sla_threshold - self.orange_threshold
+
+        def status_of(value: float) -> str:
+            if value >= sla_threshold:
+                return "COMPLIANT"
+            elif value >= warn_threshold:
+                return "WARNING"
+            return "BREACH"
+
+        # Column widths must be known before streaming: the longest line per
+        # column, headers (multi-line) included. The SLA Target column repeats
+        # one value and the status labels are never wider than their header,
+        # so only the data columns are scanned; rows are built as they are
+        # written.
+        columns = [names, hosts, *availability, [sla_target] if names else [], []]
+        col_widths = [
+            max(
+                max(len(line) for line in str(cell_value).split("\n"))
+                for cell_value in [header, *column]
+                if cell_value
             )
+            for header, column in zip(headers, columns)
+        ]
 
-        # Write data
-        for row_idx, host_data in enumerate(data, 2):
-            # Host Name
-            cell = ws.cell(row=row_idx, column=1, value=host_data.get("name", ""))
-            cell.border = self.border
+        # Auto-adjust column widths
+        for col, width in enumerate(col_widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width + 2
 
-            # Host (technical name)
-            cell = ws.cell(row=row_idx, column=2, value=host_data.get("host", ""))
-            cell.border = self.border
+        # Set row height for header
+        ws.row_dimensions[1].height = 40
 
-            # Availability columns
-            availability_cols = [
-                ("avail_1_day", 3),
-                ("avail_7_days", 4),
-                ("avail_prev_month", 5),
-                ("device_sla", 6),
-            ]
+        # Write headers
+        ws.append([self._cell(ws, header, "header") for header in headers])
 
-            for key, col in availability_cols:
-                value = host_data.get(key, 100.0)
-                cell = ws.cell(row=row_idx, column=col, value=value)
-                cell.number_format = "0.00"
-                fill, font = self.get_cell_style(value)
-                cell.fill = fill
-                cell.font = font
-                cell.border = self.border
-                cell.alignment = self.center_align
+        # Write data
+        for name, host, *host_availability in zip(names, hosts, *availability):
+            # Host Name, Host (technical name)
+            row_cells = [self._cell(ws, name), self._cell(ws, host)]
+
+            # Availability columns
+            for value in host_availability:
+                status = status_of(value)
+                row_cells.append(self._cell(ws, value, f"{status} number"))
 
             # SLA Target column (shows the target value)
-            cell = ws.cell(row=row_idx, column=7, value=sla_target)
-            cell.number_format = "0.00"
-            cell.border = self.border
-            cell.alignment = self.center_align
-
-            # SLA Status
-            device_sla = host_data.get("device_sla", 100.0)
-            if device_sla >= self.sla_threshold:
-                status = "COMPLIANT"
-                fill, font = self.green_fill, self.green_font
-            elif device_sla >= self.sla_threshold - self.orange_threshold:
-                status = "WARNING"
-                fill, font = self.orange_fill, self.orange_font
-            else:
-                status = "BREACH"
-                fill, font = self.red_fill, self.red_font
+            row_cells.append(self._cell(ws, sla_target, "number"))
+
+            # SLA Status (same thresholds as the Device SLA cell, the last
+            # availability column)
+            row_cells.append(self._cell(ws, status, status))
 
-            cell = ws.cell(row=row_idx, column=8, value=status)
-            cell.fill = fill
-            cell.font = font
-            cell.border = self.border
-            cell.alignment = self.center_align
+            ws.append(row_cells)
 
         # Add Overall SLA row at the bottom
-        if data:
-            overall_row = len(data) + 3  # Skip one row for spacing
+        if names:
+            overall_row = len(names) + 3  # Skip one row for spacing
+            ws.append([])
 
             # Calculate overall SLA based on TOTAL TIME (not average)
-            total_downtime_1_day = sum(h.get("downtime_1_day", 0) for h in data)
-            total_downtime_7_days = sum(h.get("downtime_7_days", 0) for h in data)
-            total_downtime_prev_month = sum(h.get("downtime_prev_month", 0) for h in data)
-
-            total_possible_1_day = sum(h.get("total_1_day", 86400) for h in data)
-            total_possible_7_days = sum(h.get("total_7_days", 604800) for h in data)
-            total_possible_prev_month = sum(h.get("total_prev_month", 2592000) for h in data)
+            total_downtime_1_day, total_downtime_7_days, total_downtime_prev_month = map(sum, downtime)
+            total_possible_1_day, total_possible_7_days, total_possible_prev_month = map(sum, possible)
 
             overall_1_day = ((total_possible_1_day - total_downtime_1_day) / total_possible_1_day * 100) if total_possible_1_day > 0 else 100.0
             overall_7_days = ((total_possible_7_days - total_downtime_7_days) / total_possible_7_days * 100) if total_possible_7_days > 0 else 100.0
             overall_prev_month = ((total_possible_prev_month - total_downtime_prev_month) / total_possible_prev_month * 100) if total_possible_prev_month > 0 else 100.0
             overall_sla = overall_prev_month  # Use prev month for device sheet overall
 
-            # Overall label
-            cell = ws.cell(row=overall_row, column=1, value="OVERALL GROUP SLA")
-            cell.font = Font(bold=True, size=11)
-            cell.border = self.border
-            ws.merge_cells(start_row=overall_row, start_column=1, end_row=overall_row, end_column=2)
+            # Overall label (merged across the two name columns)
+            row_cells = [self._cell(ws, "OVERALL GROUP SLA", "label"), None]
+            ws.merged_cells.add(f"A{overall_row}:B{overall_row}")
 
             # Overall availability values
-            overall_cols = [
-                (overall_1_day, 3),
-                (overall_7_days, 4),
-                (overall_prev_month, 5),
-                (overall_sla, 6),
-            ]
-
-            for value, col in overall_cols:
-                cell = ws.cell(row=overall_row, column=col, value=round(value, 2))
-                cell.number_format = "0.00"
-                fill, font = self.get_cell_style(value)
-                cell.fill = fill
-                cell.font = Font(bold=True, color=font.color)
-                cell.border = self.border
-                cell.alignment = self.center_align
+            for value in (overall_1_day, overall_7_days, overall_prev_month, overall_sla):
+                row_cells.append(self._cell(ws, round(value, 2), f"{self.get_status(value)} number bold"))
 
             # SLA Target
-            cell = ws.cell(row=overall_row, column=7, value=sla_target)
-            cell.number_format = "0.00"
-            cell.font = Font(bold=True)
-            cell.border = self.border
-            cell.alignment = self.center_align
+            row_cells.append(self._cell(ws, sla_target, "number bold"))
 
             # Overall status
-            if overall_sla >= self.sla_threshold:
-                status = "COMPLIANT"
-                fill, font_style = self.green_fill, self.green_font
-            elif overall_sla >= self.sla_threshold - self.orange_threshold:
-                status = "WARNING"
-                fill, font_style = self.orange_fill, self.orange_font
-            else:
-                status = "BREACH"
-                fill, font_style = self.red_fill, self.red_font
-
-            cell = ws.cell(row=overall_row, column=8, value=status)
-            cell.fill = fill
-            cell.font = Font(bold=True, color=font_style.color)
-            cell.border = self.border
-            cell.alignment = self.center_align
-
-        # Auto-adjust column widths
-        for col in range(1, len(headers) + 1):
-            max_length = 0
-            column_letter = get_column_letter(col)
-            for row in range(1, len(data) + 2):
-                cell_value = ws.cell(row=row, column=col).value
-                if cell_value:
-                    # Handle multi-line headers
-                    lines = str(cell_value).split("\n")
-                    max_line_length = max(len(line) for line in lines)
-                    if max_line_length > max_length:
-                        max_length = max_line_length
-            ws.column_dimensions[column_letter].width = max_length + 2
-
-        # Set row height for header
-        ws.row_dimensions[1].height = 40
+            status = self.get_status(overall_sla)
+            row_cells.append(self._cell(ws, status, f"{status} bold"))
+            ws.append(row_cells)
 
     def add_summary_sheet(self, group_summaries: list[dict]):
         """Add a summary sheet with overall SLA compliance."""
@@ -497,90 +743,37 @@ class ExcelReportGenerator:
             "SLA Status",
         ]
 
-        # Write headers
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = self.header_fill
-            cell.font = self.header_font
-            cell.border = self.border
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        # Set header row height
+        # Fixed column widths and header row height
+        col_widths = [20, 12, 12, 12, 12, 12, 15, 18, 18, 15, 12]
+        for col, width in enumerate(col_widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
         ws.row_dimensions[1].height = 40
 
+        # Write headers
+        ws.append([self._cell(ws, header, "header") for header in headers])
+
         # Write summary data
-        for row_idx, summary in enumerate(group_summaries, 2):
-            ws.cell(row=row_idx, column=1, value=summary["group_name"]).border = self.border
+        for summary in group_summaries:
+            row_cells = [self._cell(ws, summary["group_name"])]
 
             # SLA Target for this group
             group_sla_target = summary.get("sla_threshold", self.sla_threshold)
-            cell = ws.cell(row=row_idx, column=2, value=group_sla_target)
-            cell.number_format = "0.00"
-            cell.border = self.border
-            cell.alignment = self.center_align
-
-            cell = ws.cell(row=row_idx, column=3, value=summary["total"])
-            cell.border = self.border
-            cell.alignment = self.center_align
-
-            cell = ws.cell(row=row_idx, column=4, value=summary["compliant"])
-            cell.border = self.border
-            cell.alignment = self.center_align
-
-            cell = ws.cell(row=row_idx, column=5, value=summary["warning"])
-            cell.border = self.border
-            cell.alignment = self.center_align
+            row_cells.append(self._cell(ws, group_sla_target, "number"))
 
-            cell = ws.cell(row=row_idx, column=6, value=summary["breach"])
-            cell.border = self.border
-            cell.alignment = self.center_align
+            # Host counts
+            for key in ("total", "compliant", "warning", "breach"):
+                row_cells.append(self._cell(ws, summary[key], "center"))
 
             # Overall SLA columns with color coding (use group-specific threshold)
-            sla_cols = [
-                ("overall_1_day", 7),
-                ("overall_7_days", 8),
-                ("overall_prev_month", 9),
-                ("overall_sla", 10),
-            ]
-
-            for key, col in sla_cols:
+            for key in ("overall_1_day", "overall_7_days", "overall_prev_month", "overall_sla"):
                 value = summary.get(key, 100.0)
-                cell = ws.cell(row=row_idx, column=col, value=value)
-                cell.number_format = "0.00"
-                # Use group-specific SLA threshold for color coding
-                if value >= group_sla_target:
-                    fill, font = self.green_fill, self.green_font
-                elif value >= group_sla_target - self.orange_threshold:
-                    fill, font = self.orange_fill, self.orange_font
-                else:
-                    fill, font = self.red_fill, self.red_font
-                cell.fill = fill
-                cell.font = font
-                cell.border = self.border
-                cell.alignment = self.center_align
-
-            # SLA Status (use group-specific threshold)
-            overall_sla = summary.get("overall_sla", 100.0)
-            if overall_sla >= group_sla_target:
-                status = "COMPLIANT"
-                fill, font = self.green_fill, self.green_font
-            elif overall_sla >= group_sla_target - self.orange_threshold:
-                status = "WARNING"
-                fill, font = self.orange_fill, self.orange_font
-            else:
-                status = "BREACH"
-                fill, font = self.red_fill, self.red_font
+                status = self.get_status(value, group_sla_target)
+                row_cells.append(self._cell(ws, value, f"{status} number"))
 
-            cell = ws.cell(row=row_idx, column=11, value=status)
-            cell.fill = fill
-            cell.font = font
-            cell.border = self.border
-            cell.alignment = self.center_align
+            # SLA Status (status of overall_sla, the last column above)
+            row_cells.append(self._cell(ws, status, status))
 
-        # Auto-adjust column widths
-        col_widths = [20, 12, 12, 12, 12, 12, 15, 18, 18, 15, 12]
-        for col, width in enumerate(col_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
+            ws.append(row_cells)
 
     def save(self, filename: str):
         """Save the workbook to a file."""
@@ -588,6 +781,24 @@ class ExcelReportGenerator:
         print(f"Report saved to: {filename}")
 
 
+def write_group_report(
+    output_file: str,
+    group_name: str,
+    sheet_columns: tuple,
+    summary: dict,
+    sla_threshold: float,
+    orange_threshold: float,
+):
+    """
+    Build and save a single-group report (separate mode; runs in a worker
+    process). sheet_columns are the arguments of create_sheet_columns.
+    """
+    report = ExcelReportGenerator(sla_threshold, orange_threshold)
+    report.create_sheet_columns(group_name, *sheet_columns, sla_threshold)
+    report.add_summary_sheet([summary])
+    report.workbook.save(output_file)
+
+
 def load_config(config_path: str) -> dict:
     """Load configuration from YAML file."""
     with open(config_path, "r") as f:
@@ -649,263 +860,308 @@ Examples:
 
     config = load_config(config_path)
 
-    # Initialize Zabbix API
-    zabbix = ZabbixAPI(config["zabbix"]["url"], config["zabbix"]["token"])
-
-    # Test connection
-    try:
-        api_version = zabbix._call("apiinfo.version", use_auth=False)
-        print(f"Connected to Zabbix API version: {api_version}")
-    except Exception as e:
-        print(f"Error connecting to Zabbix: {e}")
-        sys.exit(1)
-
-    # Calculate date ranges
-    date_calc = DateRangeCalculator()
-
-    # Determine SLA period label
-    if args.period == "day":
-        sla_period_name = "1 Day"
-    elif args.period == "week":
-        sla_period_name = "7 Days"
-    else:
-        sla_period_name = "Previous Month"
-
-    print(f"SLA Period: {sla_period_name}")
-
-    # Get availability periods (relative to current date)
-    availability_periods = date_calc.get_availability_periods()
-
-    # Get default SLA settings
-    default_sla = config.get("default_sla_threshold", 99.9)
-    default_orange = config.get("default_orange_threshold", 5.0)
-    report_mode = config.get("report_mode", "combined")
-
-    # Get global excluded hosts
-    global_excluded = config.get("global_excluded_hosts", []) or []
-    global_excluded_lower = [h.lower() for h in global_excluded]
-    if global_excluded:
-        print(f"Globally excluding hosts: {', '.join(global_excluded)}")
-
-    # Get host groups configuration
-    host_groups_config = config.get("host_groups", {})
-
-    # Handle command line override or legacy list format
-    if args.groups:
-        # Command line groups use default SLA
-        host_groups_config = {g: {} for g in args.groups}
-    elif isinstance(host_groups_config, list):
-        # Legacy list format - convert to dict
-        host_groups_config = {g: {} for g in host_groups_config}
-
-    if not host_groups_config:
-        print("Error: No host groups specified in config or command line")
-        sys.exit(1)
-
-    group_names = list(host_groups_config.keys())
-    print(f"Processing host groups: {', '.join(group_names)}")
-    print(f"Report mode: {report_mode}")
-
-    # Fetch all host groups from Zabbix
-    groups = zabbix.get_host_groups(group_names)
-
-    if not groups:
-        print(f"Warning: No host groups found matching: {group_names}")
-        sys.exit(1)
-
-    # For combined mode, create one report generator
-    combined_report = None
-    all_group_summaries = []
-
-    if report_mode == "combined":
-        combined_report = ExcelReportGenerator(default_sla, default_orange)
-
-    output_config = config.get("output", {})
-    output_dir = output_config.get("output_dir", ".")
-    prefix = output_config.get("filename_prefix", "SLA_Report")
-    include_timestamp = output_config.get("include_timestamp", True)
-
-    for group in groups:
-        group_name = group["name"]
-        group_id = group["groupid"]
-
-        # Get group-specific config
-        group_config = host_groups_config.get(group_name, {})
-        sla_threshold = group_config.get("sla_threshold", default_sla)
-        orange_threshold = group_config.get("orange_threshold", default_orange)
-        group_excluded = group_config.get("excluded_hosts", []) or []
-        group_excluded_lower = [h.lower() for h in group_excluded]
-
-        # Combine global and group-specific exclusions
-        all_excluded_lower = global_excluded_lower + group_excluded_lower
-
-        print(f"\nProcessing group: {group_name}")
-        print(f"  SLA Threshold: {sla_threshold}%")
-        if group_excluded:
-            print(f"  Group-specific exclusions: {', '.join(group_excluded)}")
-
-        # Get hosts in group
-        hosts = zabbix.get_hosts_in_group(group_id)
-        print(f"  Found {len(hosts)} hosts")
-
-        if not hosts:
-            continue
-
-        host_data_list = []
-        summary = {
-            "group_name": group_name,
-            "sla_threshold": sla_threshold,
-            "total": 0,
-            "compliant": 0,
-            "warning": 0,
-            "breach": 0,
-        }
-
-        for host in hosts:
-            host_id = host["hostid"]
-            host_name = host["name"]
-            host_technical = host["host"]
+    # Initialize Zabbix API; the connection pool is closed once all data is fetched.
+    # Host groups are fetched concurrently over the client's shared connection
+    # pool (pool_maxsize=50), so keep max_workers at or below that.
+    # Separate-mode workbooks are written by a process pool; processes start
+    # with "spawn" because fetch threads are running when they are created.
+    with ZabbixAPI(config["zabbix"]["url"], config["zabbix"]["token"]) as zabbix, \
+            ThreadPoolExecutor(max_workers=config.get("max_workers", 16)) as executor, \
+            ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as report_pool:
+        # Test connection
+        try:
+            api_version = zabbix._call("apiinfo.version", use_auth=False)
+            print(f"Connected to Zabbix API version: {api_version}")
+        except ZabbixAPIError as e:
+            print(f"Error connecting to Zabbix: {e}")
+            sys.exit(1)
+
+        # Calculate date ranges
+        date_calc = DateRangeCalculator()
+
+        # Resolve the SLA period once: index of its row in the per-host
+        # arrays (1 day, 7 days, prev month) and its label
+        period_index = {"day": 0, "week": 1, "month": 2}[args.period]
+        sla_period_name = ("1 Day", "7 Days", "Previous Month")[period_index]
+
+        print(f"SLA Period: {sla_period_name}")
+
+        # Get availability periods (relative to current date)
+        availability_periods = date_calc.get_availability_periods()
+
+        # Get default SLA settings
+        default_sla = config.get("default_sla_threshold", 99.9)
+        default_orange = config.get("default_orange_threshold", 5.0)
+        report_mode = config.get("report_mode", "combined")
+
+        # Get global excluded hosts
+        global_excluded = config.get("global_excluded_hosts", []) or []
+        global_excluded_lower = frozenset(h.lower() for h in global_excluded)
+        if global_excluded:
+            print(f"Globally excluding hosts: {', '.join(global_excluded)}")
+
+        # Get host groups configuration
+        host_groups_config = config.get("host_groups", {})
+
+        # Handle command line override or legacy list format
+        if args.groups:
+            # Command line groups use default SLA
+            host_groups_config = {g: {} for g in args.groups}
+        elif isinstance(host_groups_config, list):
+            # Legacy list format - convert to dict
+            host_groups_config = {g: {} for g in host_groups_config}
+
+        if not host_groups_config:
+            print("Error: No host groups specified in config or command line")
+            sys.exit(1)
+
+        group_names = list(host_groups_config.keys())
+        print(f"Processing host groups: {', '.join(group_names)}")
+        print(f"Report mode: {report_mode}")
+
+        # Fetch all host groups from Zabbix
+        groups = zabbix.get_host_groups(group_names)
+
+        if not groups:
+            print(f"Warning: No host groups found matching: {group_names}")
+            sys.exit(1)
+
+        # For combined mode, create one report generator
+        combined_report = None
+        all_group_summaries = []
+
+        if report_mode == "combined":
+            combined_report = ExcelReportGenerator(default_sla, default_orange)
+
+        output_config = config.get("output", {})
+        output_dir = output_config.get("output_dir", ".")
+        prefix = output_config.get("filename_prefix", "SLA_Report")
+        include_timestamp = output_config.get("include_timestamp", True)
+        # One timestamp per run, shared by every file the run writes
+        file_base = f"{output_dir}/{prefix}"
+        if include_timestamp:
+            file_suffix = f"_{args.period}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        else:
+            file_suffix = f"_{args.period}.xlsx"
 
-            # Check if host should be excluded (global + group-specific)
-            if host_name.lower() in all_excluded_lower or host_technical.lower() in all_excluded_lower:
-                print(f"    Skipping (excluded): {host_name}")
-                continue
+        # Unix bounds of each availability period, shared by every group
+        period_bounds = [
+            (int(availability_periods[key][0].timestamp()), int(availability_periods[key][1].timestamp()))
+            for key in ("1_day", "7_days", "prev_month")
+        ]
 
-            print(f"    Processing: {host_name}")
+        # One event fetch per group over the span of all three periods; each
+        # period is then computed locally from the same events
+        outer_from = min(time_from for time_from, _ in period_bounds)
+        outer_till = max(time_till for _, time_till in period_bounds)
 
-            # Calculate availability for each period
-            avail_1_day = zabbix.get_host_availability(
-                host_id,
-                int(availability_periods["1_day"][0].timestamp()),
-                int(availability_periods["1_day"][1].timestamp()),
+        # Lower-cased global + group-specific excluded host names, built once
+        # per group as sets for O(1) lookups
+        excluded_by_group = {
+            group["name"]: global_excluded_lower.union(
+                h.lower() for h in host_groups_config.get(group["name"], {}).get("excluded_hosts", []) or []
             )
+            for group in groups
+        }
 
-            avail_2_to_7 = zabbix.get_host_availability(
-                host_id,
-                int(availability_periods["7_days"][0].timestamp()),
-                int(availability_periods["7_days"][1].timestamp()),
+        def is_excluded(host: dict, excluded_lower: frozenset[str]) -> bool:
+            return bool(excluded_lower) and (
+                host["name"].lower() in excluded_lower or host["host"].lower() in excluded_lower
             )
 
-            avail_2_to_30 = zabbix.get_host_availability(
-                host_id,
-                int(availability_periods["prev_month"][0].timestamp()),
-                int(availability_periods["prev_month"][1].timestamp()),
+        # Host lists of all groups are fetched concurrently
+        host_futures = [executor.submit(zabbix.get_hosts_in_group, group["groupid"]) for group in groups]
+
+        # Events are fetched once per host: a host in several groups goes into
+        # the batch of the first group that includes it. One event.get batch
+        # per group keeps the number of API calls independent of group size,
+        # and each batch is submitted as soon as its group's hosts are known.
+        event_futures = []
+        batched_host_ids = set()
+        for group, host_future in zip(groups, host_futures):
+            try:
+                hosts = host_future.result()
+            except ZabbixAPIError:
+                event_futures.append(None)  # reported when the group is processed
+                continue
+            excluded_lower = excluded_by_group[group["name"]]
+            new_host_ids = [
+                h["hostid"] for h in hosts
+                if h["hostid"] not in batched_host_ids and not is_excluded(h, excluded_lower)
+            ]
+            batched_host_ids.update(new_host_ids)
+            event_futures.append(
+                executor.submit(zabbix.get_host_events_bulk, new_host_ids, outer_from, outer_till)
+                if new_host_ids else None
             )
 
-            # Device SLA is based on the selected period
-            if args.period == "day":
-                device_sla = avail_1_day["availability"]
-            elif args.period == "week":
-                device_sla = avail_2_to_7["availability"]
-            else:  # month
-                device_sla = avail_2_to_30["availability"]
-
-            host_data = {
-                "name": host_name,
-                "host": host_technical,
-                "avail_1_day": avail_1_day["availability"],
-                "avail_7_days": avail_2_to_7["availability"],
-                "avail_prev_month": avail_2_to_30["availability"],
-                "device_sla": device_sla,
-                # Store actual seconds for overall calculation
-                "downtime_1_day": avail_1_day["downtime_seconds"],
-                "downtime_7_days": avail_2_to_7["downtime_seconds"],
-                "downtime_prev_month": avail_2_to_30["downtime_seconds"],
-                "total_1_day": avail_1_day["total_seconds"],
-                "total_7_days": avail_2_to_7["total_seconds"],
-                "total_prev_month": avail_2_to_30["total_seconds"],
-            }
-
-            host_data_list.append(host_data)
+        # Groups are processed in configured order, so sheets and log lines
+        # keep that order; batches of earlier groups are always merged first
+        events_by_host = {}
+        recovery_map = {}
+        failed_groups = []
+        separate_reports = []
+        for group, host_future, events_future in zip(groups, host_futures, event_futures):
+            group_name = group["name"]
+
+            # Get group-specific config
+            group_config = host_groups_config.get(group_name, {})
+            sla_threshold = group_config.get("sla_threshold", default_sla)
+            orange_threshold = group_config.get("orange_threshold", default_orange)
+            group_excluded = group_config.get("excluded_hosts", []) or []
+
+            # Combine global and group-specific exclusions
+            all_excluded_lower = excluded_by_group[group_name]
+
+            print(f"\nProcessing group: {group_name}")
+            print(f"  SLA Threshold: {sla_threshold}%")
+            if group_excluded:
+                print(f"  Group-specific exclusions: {', '.join(group_excluded)}")
+
+            # A group that still fails after the adapter's retries is left out
+            # of the report; the others are still generated
+            try:
+                hosts = host_future.result()
+                if events_future is not None:
+                    batch_events, batch_recoveries = events_future.result()
+                    events_by_host.update(batch_events)
+                    recovery_map.update(batch_recoveries)
+                # Hosts shared with an earlier group whose batch failed
+                unfetched = sum(
+                    1 for h in hosts
+                    if h["hostid"] not in events_by_host and not is_excluded(h, all_excluded_lower)
+                )
+                if unfetched:
+                    raise ZabbixAPIError(f"events of {unfetched} host(s) could not be fetched")
+            except ZabbixAPIError as e:
+                print(f"  Error fetching group data, skipping group: {e}")
+                failed_groups.append(group_name)
+                continue
 
-            # Update summary counts
-            summary["total"] += 1
-            if device_sla >= sla_threshold:
-                summary["compliant"] += 1
-            elif device_sla >= sla_threshold - orange_threshold:
-                summary["warning"] += 1
-            else:
-                summary["breach"] += 1
+            print(f"  Found {len(hosts)} hosts")
 
-        # Calculate overall SLA for the group based on TOTAL TIME (not average)
-        # Formula: ((Total Possible Uptime - Total Downtime) / Total Possible Uptime) × 100
-        if host_data_list:
-            # Sum all downtime and total time across all devices
-            total_downtime_1_day = sum(h["downtime_1_day"] for h in host_data_list)
-            total_downtime_7_days = sum(h["downtime_7_days"] for h in host_data_list)
-            total_downtime_prev_month = sum(h["downtime_prev_month"] for h in host_data_list)
+            if not hosts:
+                continue
 
-            total_possible_1_day = sum(h["total_1_day"] for h in host_data_list)
-            total_possible_7_days = sum(h["total_7_days"] for h in host_data_list)
-            total_possible_prev_month = sum(h["total_prev_month"] for h in host_data_list)
+            summary = {
+                "group_name": group_name,
+                "sla_threshold": sla_threshold,
+                "total": 0,
+                "compliant": 0,
+                "warning": 0,
+                "breach": 0,
+            }
 
-            # Calculate overall SLA based on total time
-            overall_1_day = ((total_possible_1_day - total_downtime_1_day) / total_possible_1_day * 100) if total_possible_1_day > 0 else 100.0
-            overall_7_days = ((total_possible_7_days - total_downtime_7_days) / total_possible_7_days * 100) if total_possible_7_days > 0 else 100.0
-            overall_prev_month = ((total_possible_prev_month - total_downtime_prev_month) / total_possible_prev_month * 100) if total_possible_prev_month > 0 else 100.0
+            included_hosts = []
+            for host in hosts:
+                # Check if host should be excluded (global + group-specific)
+                if is_excluded(host, all_excluded_lower):
+                    print(f"    Skipping (excluded): {host['name']}")
+                    continue
+                print(f"    Processing: {host['name']}")
+                included_hosts.append(host)
+            n_hosts = len(included_hosts)
+
+            # Per-host columns (SoA): one row per period, in period_bounds order
+            avail = np.empty((3, n_hosts))
+            downtime = np.empty((3, n_hosts), dtype=np.int64)
+            total = np.empty((3, n_hosts), dtype=np.int64)
+            for i, host in enumerate(included_hosts):
+                # Calculate availability for each period from the group's events
+                starts, ends = event_intervals(events_by_host[host["hostid"]], recovery_map)
+                for p, (time_from, time_till) in enumerate(period_bounds):
+                    host_avail = availability_stats(
+                        clamped_downtime(starts, ends, time_from, time_till), time_from, time_till,
+                    )
+                    avail[p, i] = host_avail["availability"]
+                    downtime[p, i] = host_avail["downtime_seconds"]
+                    total[p, i] = host_avail["total_seconds"]
+
+            # Device SLA is based on the selected period. Classify all hosts of
+            # the group and sum their seconds per period at once.
+            device_slas = avail[period_index]
+            counts, td, tp = summarize_group(device_slas, downtime, total, sla_threshold, orange_threshold)
+            summary.update({
+                "total": n_hosts,
+                "compliant": int(counts[0]), "warning": int(counts[1]), "breach": int(counts[2]),
+            })
+
+            # Sheet columns straight from the arrays; no per-host dicts
+            sheet_columns = (
+                [host["name"] for host in included_hosts],
+                [host["host"] for host in included_hosts],
+                [*avail.tolist(), device_slas.tolist()],
+                downtime.tolist(),
+                total.tolist(),
+            )
 
-            # Overall SLA based on selected period
-            if args.period == "day":
-                overall_sla = overall_1_day
-            elif args.period == "week":
-                overall_sla = overall_7_days
+            # Calculate overall SLA for the group based on TOTAL TIME (not average)
+            # Formula: ((Total Possible Uptime - Total Downtime) / Total Possible Uptime) × 100
+            if n_hosts:
+                # Overall SLA per period; 100% where there was no possible time
+                ratio = np.ones(3)
+                np.divide(tp - td, tp, out=ratio, where=tp > 0)
+                overall = np.round(ratio * 100, 2)
+
+                # Overall SLA based on selected period
+                summary["overall_sla"] = float(overall[period_index])
+                (
+                    summary["overall_1_day"],
+                    summary["overall_7_days"],
+                    summary["overall_prev_month"],
+                ) = overall.tolist()
             else:
-                overall_sla = overall_prev_month
-
-            summary["overall_sla"] = round(overall_sla, 2)
-            summary["overall_1_day"] = round(overall_1_day, 2)
-            summary["overall_7_days"] = round(overall_7_days, 2)
-            summary["overall_prev_month"] = round(overall_prev_month, 2)
-        else:
-            summary["overall_sla"] = 100.0
-            summary["overall_1_day"] = 100.0
-            summary["overall_7_days"] = 100.0
-            summary["overall_prev_month"] = 100.0
-
-        all_group_summaries.append(summary)
-
-        if report_mode == "separate":
-            # Create separate report for this group
-            report = ExcelReportGenerator(sla_threshold, orange_threshold)
-            report.create_sheet(group_name, host_data_list, sla_threshold)
-            report.add_summary_sheet([summary])
-
-            # Generate filename for this group
-            safe_group_name = group_name.replace(" ", "_").replace("/", "-")
-            if include_timestamp:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = f"{output_dir}/{prefix}_{safe_group_name}_{args.period}_{timestamp}.xlsx"
+                summary["overall_sla"] = 100.0
+                summary["overall_1_day"] = 100.0
+                summary["overall_7_days"] = 100.0
+                summary["overall_prev_month"] = 100.0
+
+            all_group_summaries.append(summary)
+
+            if report_mode == "separate":
+                # Generate filename for this group
+                safe_group_name = group_name.replace(" ", "_").replace("/", "-")
+                output_file = f"{file_base}_{safe_group_name}{file_suffix}"
+
+                # Create separate report for this group in a worker process, so
+                # the next group is processed while this one is serialized
+                separate_reports.append((output_file, report_pool.submit(
+                    write_group_report,
+                    output_file, group_name, sheet_columns, summary, sla_threshold, orange_threshold,
+                )))
             else:
-                output_file = f"{output_dir}/{prefix}_{safe_group_name}_{args.period}.xlsx"
-
-            report.save(output_file)
+                # Add to combined report
+                combined_report.sla_threshold = sla_threshold
+                combined_report.orange_threshold = orange_threshold
+                combined_report.create_sheet_columns(group_name, *sheet_columns, sla_threshold)
+
+        # Wait for the separate reports, in group order
+        for output_file, future in separate_reports:
+            future.result()
+            print(f"Report saved to: {output_file}")
             print(f"  Report saved: {output_file}")
-        else:
-            # Add to combined report
-            combined_report.sla_threshold = sla_threshold
-            combined_report.orange_threshold = orange_threshold
-            combined_report.create_sheet(group_name, host_data_list, sla_threshold)
 
-    # Save combined report if in combined mode
-    if report_mode == "combined" and combined_report:
-        combined_report.add_summary_sheet(all_group_summaries)
+        # Save combined report if in combined mode
+        if report_mode == "combined" and combined_report:
+            combined_report.add_summary_sheet(all_group_summaries)
 
-        if args.output:
-            output_file = args.output
-        else:
-            if include_timestamp:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = f"{output_dir}/{prefix}_{args.period}_{timestamp}.xlsx"
-            else:
-                output_file = f"{output_dir}/{prefix}_{args.period}.xlsx"
+            output_file = args.output or f"{file_base}{file_suffix}"
 
-        combined_report.save(output_file)
+            combined_report.save(output_file)
 
     print(f"\nReport generation complete!")
     print(f"\nSummary by group:")
-    for summary in all_group_summaries:
-        sla = summary.get("sla_threshold", default_sla)
-        print(f"  {summary['group_name']}: SLA {sla}% | {summary['total']} hosts | {summary['compliant']} compliant | {summary['warning']} warning | {summary['breach']} breach")
+    # One write for the whole summary instead of a print per group
+    summary_lines = [
+        f"  {summary['group_name']}: SLA {summary.get('sla_threshold', default_sla)}% | {summary['total']} hosts | {summary['compliant']} compliant | {summary['warning']} warning | {summary['breach']} breach"
+        for summary in all_group_summaries
+    ]
+    if summary_lines:
+        print("\n".join(summary_lines))
+
+    if failed_groups:
+        print(f"\nError: data could not be fetched for: {', '.join(failed_groups)}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":